@@ -0,0 +1,132 @@
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+
+from send_calendar import local_now
+
+logger = logging.getLogger(__name__)
+
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+@dataclass(slots=True)
+class BackupResult:
+    path: str
+    size: int
+    pages: int
+    restarts: int
+    seconds: float
+
+class BackupManager:
+    PREFIX = 'nonecore-'
+    
+    def __init__(self, db, config):
+        self.db = db
+        self.config = config
+        self.lock = asyncio.Lock()
+    
+    @property
+    def running(self) -> bool:
+        return self.lock.locked()
+    
+    def snapshot(self, target: str) -> BackupResult:
+        started = time.perf_counter()
+        progress = {'pages': 0, 'remaining': None, 'restarts': 0}
+        
+        def on_progress(status, remaining, total):
+            # The backup starts over when another connection writes to the source between steps
+            if progress['remaining'] is not None and remaining > progress['remaining']:
+                progress['restarts'] += 1
+            progress['remaining'] = remaining
+            progress['pages'] = total
+            # backup()'s own sleep only applies after BUSY/LOCKED, so yield to writers between successful steps here
+            if remaining and self.config.BACKUP_SLEEP > 0:
+                time.sleep(self.config.BACKUP_SLEEP)
+        
+        source = sqlite3.connect(self.db.db_path)
+        dest = sqlite3.connect(target)
+        try:
+            source.backup(dest, pages=self.config.BACKUP_PAGES, progress=on_progress, sleep=self.config.BACKUP_SLEEP)
+        finally:
+            dest.close()
+            source.close()
+        
+        if self.config.BACKUP_COMPRESS:
+            with open(target, 'rb') as raw, gzip.open(f"{target}.gz", 'wb', compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1024 * 1024)
+            os.remove(target)
+            target = f"{target}.gz"
+        
+        return BackupResult(
+            path=target,
+            size=os.path.getsize(target),
+            pages=progress['pages'],
+            restarts=progress['restarts'],
+            seconds=time.perf_counter() - started
+        )
+    
+    def rotate(self):
+        names = sorted(
+            name for name in os.listdir(self.config.BACKUP_DIR)
+            if name.startswith(self.PREFIX) and name.endswith(('.db', '.db.gz'))
+        )
+        for name in names[:-self.config.BACKUP_KEEP] if self.config.BACKUP_KEEP > 0 else []:
+            os.remove(os.path.join(self.config.BACKUP_DIR, name))
+    
+    async def create(self) -> BackupResult:
+        async with self.lock:
+            os.makedirs(self.config.BACKUP_DIR, exist_ok=True)
+            stamp = local_now(self.db.tz).strftime('%Y%m%d-%H%M%S')
+            target = os.path.join(self.config.BACKUP_DIR, f"{self.PREFIX}{stamp}.db")
+            
+            result = await asyncio.to_thread(self.snapshot, target)
+            await asyncio.to_thread(self.rotate)
+            await self.db.set_setting('last_backup_at', str(time.time()))
+            logger.info(
+                "Backup written to %s: %s pages, %s bytes, %s restarts, %.2fs",
+                result.path, result.pages, result.size, result.restarts, result.seconds
+            )
+            return result
+    
+    async def send(self, bot, chat_id: int) -> BackupResult:
+        result = await self.create()
+        if result.size > MAX_DOCUMENT_SIZE:
+            await bot.send_message(
+                chat_id=chat_id,
+                text=f"⚠️ حجم بکاپ ({result.size / 1024 / 1024:.1f} مگابایت) برای ارسال در تلگرام زیاد است.\n"
+                     f"📁 فایل در سرور ذخیره شد: {result.path}"
+            )
+            return result
+        
+        with open(result.path, 'rb') as document:
+            await bot.send_document(
+                chat_id=chat_id,
+                document=document,
+                filename=os.path.basename(result.path),
+                caption=f"💾 بکاپ دیتابیس {self.config.BRAND_NAME}\n"
+                        f"📦 {result.size / 1024:.0f} کیلوبایت • ⏱ {result.seconds:.1f} ثانیه"
+            )
+        return result
+    
+    async def run(self, bot):
+        interval = self.config.BACKUP_INTERVAL_HOURS * 3600
+        if interval <= 0:
+            return
+        
+        while True:
+            last = float(await self.db.get_setting('last_backup_at', '0') or 0)
+            await asyncio.sleep(max(0, last + interval - time.time()))
+            try:
+                if self.config.BACKUP_SEND:
+                    await self.send(bot, self.config.ADMIN_ID)
+                else:
+                    await self.create()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Scheduled backup failed: %s", e)
+                await asyncio.sleep(min(interval, 3600))
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'NCBF'
+HEADER = struct.Struct('<4sHQIQ')
+
+class FingerprintFilter:
+    def __init__(self, path: str, capacity: int = 2_000_000, error_rate: float = 0.001):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self.file = None
+        self.map: Optional[mmap.mmap] = None
+        self.created = False
+    
+    def open(self):
+        size = HEADER.size + (self.bits + 7) // 8
+        self.created = not os.path.exists(self.path)
+        if not self.created:
+            with open(self.path, 'rb') as f:
+                header = f.read(HEADER.size)
+            magic, _, bits, hashes, count = HEADER.unpack(header) if len(header) == HEADER.size else (b'', 0, 0, 0, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a fingerprint filter")
+            if (bits, hashes) != (self.bits, self.hashes):
+                logger.warning(
+                    f"Fingerprint filter {self.path} was built for different capacity/error rate, keeping its geometry"
+                )
+                self.bits, self.hashes = bits, hashes
+                size = HEADER.size + (bits + 7) // 8
+            self.count = count
+        else:
+            with open(self.path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, 1, self.bits, self.hashes, 0))
+                f.truncate(size)
+        
+        self.file = open(self.path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), size)
+        logger.info(
+            f"Fingerprint filter loaded: {self.count} entries, {size / 1024 / 1024:.1f} MB, {self.hashes} hashes"
+        )
+    
+    def _positions(self, fingerprint: str):
+        digest = hashlib.blake2b(fingerprint.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+    
+    def __contains__(self, fingerprint: str) -> bool:
+        data = self.map
+        offset = HEADER.size
+        for pos in self._positions(fingerprint):
+            if not data[offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+    
+    def add(self, fingerprint: str) -> bool:
+        data = self.map
+        offset = HEADER.size
+        added = False
+        for pos in self._positions(fingerprint):
+            index = offset + (pos >> 3)
+            mask = 1 << (pos & 7)
+            byte = data[index]
+            if not byte & mask:
+                data[index] = byte | mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+    
+    def add_many(self, fingerprints: Iterable[str]) -> int:
+        added = sum(1 for fingerprint in fingerprints if fingerprint and self.add(fingerprint))
+        if self.count > self.capacity:
+            logger.warning(
+                f"Fingerprint filter holds {self.count} entries over its capacity of {self.capacity}, "
+                "false positive rate is rising"
+            )
+        return added
+    
+    def flush(self):
+        if self.map:
+            self.map[:HEADER.size] = HEADER.pack(MAGIC, 1, self.bits, self.hashes, self.count)
+            self.map.flush()
+    
+    def close(self):
+        if self.map:
+            self.flush()
+            self.map.close()
+            self.file.close()
+            self.map = None
@@ -0,0 +1,92 @@
+import base64
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+COMPACT_PREFIX = '~'
+
+# Action codes are part of the wire format of buttons already posted in the channel: append only.
+ACTION_CODES = {
+    'copy': 1,
+    'report': 2,
+    'confirm_report': 3,
+    'cancel_report': 4
+}
+ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+
+CallbackArg = Union[int, str]
+
+def _write_varint(value: int, out: bytearray):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+def _read_varints(raw: bytes) -> List[int]:
+    values, value, shift = [], 0, 0
+    for byte in raw:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value, shift = 0, 0
+    if shift:
+        raise ValueError("truncated varint")
+    return values
+
+def encode(action: str, *args: int) -> str:
+    out = bytearray([ACTION_CODES[action]])
+    for arg in args:
+        _write_varint(arg, out)
+    return COMPACT_PREFIX + base64.urlsafe_b64encode(bytes(out)).decode('ascii').rstrip('=')
+
+def decode(data: str) -> Optional[Tuple[str, List[int]]]:
+    if not data.startswith(COMPACT_PREFIX):
+        return None
+    payload = data[len(COMPACT_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+        action = ACTION_NAMES[raw[0]]
+        return action, _read_varints(raw[1:])
+    except (ValueError, IndexError, KeyError):
+        return None
+
+class CallbackRouter:
+    def __init__(self):
+        self.routes: Dict[str, Callable[..., Awaitable]] = {}
+    
+    def register(self, action: str, handler: Callable[..., Awaitable]):
+        self.routes[action] = handler
+    
+    def parse(self, data: str) -> Optional[Tuple[str, List[CallbackArg]]]:
+        if not data:
+            return None
+        
+        compact = decode(data)
+        if compact:
+            return compact
+        
+        if data in self.routes:
+            return data, []
+        
+        # Plain "<action>_<arg>" data: menu buttons like quick_send_10 and legacy copy_<uuid> buttons
+        head, _, tail = data.rpartition('_')
+        if head in self.routes:
+            return head, [int(tail) if tail.isdigit() else tail]
+        return None
+    
+    async def dispatch(self, data: str, *context_args) -> bool:
+        parsed = self.parse(data)
+        if not parsed:
+            logger.warning(f"Unknown callback data: {data!r}")
+            return False
+        
+        action, args = parsed
+        await self.routes[action](*context_args, *args)
+        return True
@@ -25,9 +25,85 @@ class Config:
     CONFIG_TEXT_TEMPLATE = os.getenv('CONFIG_TEXT_TEMPLATE', '')
     CONFIG_REMARK = os.getenv('CONFIG_REMARK', 'NONEcore | تلگرام: @nonecorebot')
     
+    SCHEDULER_POOL_SIZE = int(os.getenv('SCHEDULER_POOL_SIZE', 2000))
+    SCORE_WEIGHT_QUALITY = float(os.getenv('SCORE_WEIGHT_QUALITY', 1.0))
+    SCORE_WEIGHT_FRESHNESS = float(os.getenv('SCORE_WEIGHT_FRESHNESS', 0.5))
+    SCORE_WEIGHT_REPORTS = float(os.getenv('SCORE_WEIGHT_REPORTS', 0.5))
+    SCORE_JITTER = float(os.getenv('SCORE_JITTER', 0.2))
+    DIVERSITY_PROTOCOL = float(os.getenv('DIVERSITY_PROTOCOL', 0.2))
+    DIVERSITY_LOCATION = float(os.getenv('DIVERSITY_LOCATION', 0.4))
+    DIVERSITY_SERVER = float(os.getenv('DIVERSITY_SERVER', 1.0))
+    
+    SWEEP_INTERVAL = int(os.getenv('SWEEP_INTERVAL', 1800))
+    SWEEP_BATCH_SIZE = int(os.getenv('SWEEP_BATCH_SIZE', 50))
+    SWEEP_FAIL_THRESHOLD = int(os.getenv('SWEEP_FAIL_THRESHOLD', 3))
+    PROBE_TIMEOUT = float(os.getenv('PROBE_TIMEOUT', 5))
+    PROBE_CONCURRENCY = int(os.getenv('PROBE_CONCURRENCY', 20))
+    DELETE_INTERVAL = float(os.getenv('DELETE_INTERVAL', 1))
+    
+    REFRESH_INTERVAL = int(os.getenv('REFRESH_INTERVAL', 30))
+    EDIT_INTERVAL = float(os.getenv('EDIT_INTERVAL', 1))
+    REFRESH_REPORT_THRESHOLD = int(os.getenv('REFRESH_REPORT_THRESHOLD', 2))
+    
+    STATS_HOURLY_DAYS = int(os.getenv('STATS_HOURLY_DAYS', 8))
+    MEMBER_FLUSH_INTERVAL = int(os.getenv('MEMBER_FLUSH_INTERVAL', 60))
+    MEMBER_POLL_INTERVAL = int(os.getenv('MEMBER_POLL_INTERVAL', 900))
+    
+    SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 30))
+    
+    SIMULATION_DEFAULT_LATENCY = float(os.getenv('SIMULATION_DEFAULT_LATENCY', 0.5))
+    SIMULATION_LATENCY_ALPHA = float(os.getenv('SIMULATION_LATENCY_ALPHA', 0.2))
+    SIMULATION_MAX_DAYS = int(os.getenv('SIMULATION_MAX_DAYS', 60))
+    
+    PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', 120))
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.01))
+    PROFILE_TRACE_FRAMES = int(os.getenv('PROFILE_TRACE_FRAMES', 1))
+    PROFILE_TOP = int(os.getenv('PROFILE_TOP', 8))
+    
+    SUBSCRIPTION_PORT = int(os.getenv('SUBSCRIPTION_PORT', 0))
+    SUBSCRIPTION_HOST = os.getenv('SUBSCRIPTION_HOST', '0.0.0.0')
+    SUBSCRIPTION_PATH = os.getenv('SUBSCRIPTION_PATH', 'sub')
+    SUBSCRIPTION_URL = os.getenv('SUBSCRIPTION_URL', '')
+    SUBSCRIPTION_LIMIT = int(os.getenv('SUBSCRIPTION_LIMIT', 200))
+    SUBSCRIPTION_MAX_REPORTS = int(os.getenv('SUBSCRIPTION_MAX_REPORTS', 0))
+    SUBSCRIPTION_MAX_AGE = int(os.getenv('SUBSCRIPTION_MAX_AGE', 300))
+    SUBSCRIPTION_UPDATE_HOURS = int(os.getenv('SUBSCRIPTION_UPDATE_HOURS', 6))
+    
+    GEOIP_DB_PATH = os.getenv('GEOIP_DB_PATH', '')
+    GEOIP_LOCATIONS_PATH = os.getenv('GEOIP_LOCATIONS_PATH', '')
+    DNS_CACHE_SIZE = int(os.getenv('DNS_CACHE_SIZE', 4096))
+    DNS_TIMEOUT = float(os.getenv('DNS_TIMEOUT', 3))
+    DNS_NEGATIVE_TTL = float(os.getenv('DNS_NEGATIVE_TTL', 300))
+    
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'nonecore.db')
+    ARCHIVE_DATABASE_PATH = os.getenv('ARCHIVE_DATABASE_PATH', 'nonecore_archive.db')
+    RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', 30))
+    RETENTION_INTERVAL = int(os.getenv('RETENTION_INTERVAL', 3600))
+    RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', 500))
+    VACUUM_PAGES = int(os.getenv('VACUUM_PAGES', 256))
+    VACUUM_PAUSE = float(os.getenv('VACUUM_PAUSE', 0.5))
+    BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+    BACKUP_INTERVAL_HOURS = float(os.getenv('BACKUP_INTERVAL_HOURS', 24))
+    BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', 7))
+    BACKUP_PAGES = int(os.getenv('BACKUP_PAGES', 256))
+    BACKUP_SLEEP = float(os.getenv('BACKUP_SLEEP', 0.005))
+    BACKUP_COMPRESS = os.getenv('BACKUP_COMPRESS', 'true').lower() == 'true'
+    BACKUP_SEND = os.getenv('BACKUP_SEND', 'true').lower() == 'true'
     MAX_HTML_SIZE = 10 * 1024 * 1024
+    MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+    MAX_EXPORT_SIZE = int(os.getenv('MAX_EXPORT_SIZE', 200 * 1024 * 1024))
+    INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', 4))
+    INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 500))
+    FINGERPRINT_FILTER_PATH = os.getenv('FINGERPRINT_FILTER_PATH', 'fingerprints.bloom')
+    FINGERPRINT_CAPACITY = int(os.getenv('FINGERPRINT_CAPACITY', 2_000_000))
+    FINGERPRINT_ERROR_RATE = float(os.getenv('FINGERPRINT_ERROR_RATE', 0.001))
     
     DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', 60))
+    LOG_SAMPLED_LOGGERS = [n.strip() for n in os.getenv('LOG_SAMPLED_LOGGERS', 'httpx').split(',') if n.strip()]
     TIMEZONE = os.getenv('TIMEZONE', 'Asia/Tehran')
+    QUIET_HOURS = os.getenv('QUIET_HOURS', '2-8')
+    PEAK_HOURS = os.getenv('PEAK_HOURS', '19-24')
+    PEAK_BOOST = float(os.getenv('PEAK_BOOST', 2.0))
@@ -1,17 +1,110 @@
 import aiosqlite
 import json
 import logging
+import os
+import random
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable, Tuple
+
+from zoneinfo import ZoneInfo
+
+from models import ConfigRecord, CONFIG_COLUMNS, CONFIG_SELECT, config_row_factory
+from send_calendar import local_now, local_day_bounds, utc_now
 
 logger = logging.getLogger(__name__)
 
+# stats_hourly holds quarter-hour UTC buckets so local days in zones like +03:30 or +05:45 align with them
+QUARTER_BUCKET = "strftime('%Y-%m-%dT%H:', {ts}) || printf('%02d', CAST(strftime('%M', {ts}) AS INTEGER) / 15 * 15)"
+
+ROLLUP_TABLES = {
+    'stats_hourly': QUARTER_BUCKET.format(ts="'now'"),
+    'stats_daily': "date('now')"
+}
+
+# value is part of a WITHOUT ROWID primary key and so implicitly NOT NULL
+ROLLUP_DIMENSIONS = (
+    ("'all'", "''"),
+    ("'protocol'", "COALESCE({row}.type, '')"),
+    ("'location'", "COALESCE({row}.location, '')")
+)
+
+def quarter_bucket(moment: datetime) -> str:
+    return f"{moment:%Y-%m-%dT%H}:{moment.minute // 15 * 15:02d}"
+
+def _rollup_upserts(row: str, added: str = '0', sent: str = '0', copies: str = '0', reports: str = '0') -> str:
+    statements = []
+    for table, bucket in ROLLUP_TABLES.items():
+        for dimension, value in ROLLUP_DIMENSIONS:
+            statements.append(f'''
+                INSERT INTO {table} (bucket, dimension, value, added, sent, copies, reports)
+                VALUES ({bucket}, {dimension}, {value.format(row=row)}, {added}, {sent}, {copies}, {reports})
+                ON CONFLICT(bucket, dimension, value) DO UPDATE SET
+                    added = added + excluded.added,
+                    sent = sent + excluded.sent,
+                    copies = copies + excluded.copies,
+                    reports = reports + excluded.reports;''')
+    return ''.join(statements)
+
+def _bump_totals(**deltas: str) -> str:
+    cases = ' '.join(f"WHEN '{key}' THEN {delta}" for key, delta in deltas.items())
+    keys = ', '.join(f"'{key}'" for key in deltas)
+    return f'''
+                UPDATE stats_totals SET value = value + (CASE key {cases} END) WHERE key IN ({keys});'''
+
+ROLLUP_TRIGGERS = {
+    'trg_configs_insert': f'''
+        AFTER INSERT ON configs BEGIN
+            {_bump_totals(
+                total_configs='1', queue='NEW.message_id IS NULL',
+                total_copies='NEW.copy_count', total_reports='NEW.bad_reports'
+            )}
+            {_rollup_upserts('NEW', added='1', sent='NEW.message_id IS NOT NULL')}
+        END''',
+    'trg_configs_sent': f'''
+        AFTER UPDATE OF message_id ON configs
+        WHEN OLD.message_id IS NULL AND NEW.message_id IS NOT NULL BEGIN
+            {_bump_totals(queue='-1')}
+            {_rollup_upserts('NEW', sent='1')}
+        END''',
+    'trg_configs_copies': f'''
+        AFTER UPDATE OF copy_count ON configs
+        WHEN NEW.copy_count > OLD.copy_count BEGIN
+            {_bump_totals(total_copies='NEW.copy_count - OLD.copy_count')}
+            {_rollup_upserts('NEW', copies='NEW.copy_count - OLD.copy_count')}
+        END''',
+    'trg_configs_reports': f'''
+        AFTER UPDATE OF bad_reports ON configs
+        WHEN NEW.bad_reports > OLD.bad_reports BEGIN
+            {_bump_totals(total_reports='NEW.bad_reports - OLD.bad_reports')}
+            {_rollup_upserts('NEW', reports='NEW.bad_reports - OLD.bad_reports')}
+        END''',
+    'trg_configs_delete': f'''
+        AFTER DELETE ON configs BEGIN
+            {_bump_totals(total_configs='-1', queue='-(OLD.message_id IS NULL)')}
+        END'''
+}
+
 class Database:
-    def __init__(self, db_path: str = 'nonecore.db'):
+    def __init__(self, db_path: str = 'nonecore.db', timezone: str = 'UTC'):
         self.db_path = db_path
+        self.tz = ZoneInfo(timezone)
+        self.change_listeners: List[Callable[[], None]] = []
+    
+    def add_change_listener(self, listener: Callable[[], None]):
+        self.change_listeners.append(listener)
+    
+    def _changed(self):
+        for listener in self.change_listeners:
+            listener()
     
-    async def init(self):
+    def today(self) -> str:
+        return local_now(self.tz).strftime('%Y-%m-%d')
+    
+    async def init(self, channels: Optional[List[str]] = None):
         async with aiosqlite.connect(self.db_path) as db:
+            await self._enable_incremental_vacuum(db)
+            # sqlite3 autocommits DDL, so without an explicit transaction every CREATE would sync to disk on its own
+            await db.execute('BEGIN')
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS configs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -24,15 +117,43 @@ class Database:
                     ping TEXT,
                     quality TEXT,
                     source TEXT,
+                    fingerprint TEXT,
                     channel_id TEXT,
                     message_id INTEGER,
                     bad_reports INTEGER DEFAULT 0,
                     copy_count INTEGER DEFAULT 0,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    sent_at TIMESTAMP
+                    sent_at TIMESTAMP,
+                    probe_failures INTEGER DEFAULT 0,
+                    last_probed_at TIMESTAMP,
+                    render_hash TEXT,
+                    rendered_text TEXT,
+                    render_version TEXT,
+                    rendered_markup TEXT,
+                    sweep_rank INTEGER
                 )
             ''')
             
+            await self._ensure_columns(db, 'configs', {
+                'fingerprint': 'TEXT',
+                'probe_failures': 'INTEGER DEFAULT 0',
+                'last_probed_at': 'TIMESTAMP',
+                'render_hash': 'TEXT',
+                'rendered_text': 'TEXT',
+                'render_version': 'TEXT',
+                'rendered_markup': 'TEXT',
+                'sweep_rank': 'INTEGER'
+            })
+            
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_configs_pending
+                ON configs (id) WHERE message_id IS NULL
+            ''')
+            
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_configs_fingerprint ON configs (fingerprint)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_configs_server ON configs (server)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_configs_sent_at ON configs (sent_at)')
+            
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS settings (
                     key TEXT PRIMARY KEY,
@@ -60,6 +181,29 @@ class Database:
                 )
             ''')
             
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_watermarks (
+                    source TEXT PRIMARY KEY,
+                    last_message_id INTEGER DEFAULT 0,
+                    last_date TEXT DEFAULT '',
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            await self._normalize_sent_at(db)
+            await self._init_rollups(db)
+            
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS member_stats (
+                    bucket TEXT,
+                    channel_id TEXT,
+                    joins INTEGER DEFAULT 0,
+                    leaves INTEGER DEFAULT 0,
+                    member_count INTEGER,
+                    PRIMARY KEY (bucket, channel_id)
+                ) WITHOUT ROWID
+            ''')
+            
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS queue (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -69,11 +213,185 @@ class Database:
                 )
             ''')
             
+            await self._init_default_settings(db)
+            if channels:
+                await self._sync_channels(db, channels)
+            await db.commit()
+    
+    async def _init_rollups(self, db):
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS stats_totals (
+                key TEXT PRIMARY KEY,
+                value INTEGER DEFAULT 0
+            )
+        ''')
+        
+        for table in ROLLUP_TABLES:
+            await db.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket TEXT,
+                    dimension TEXT,
+                    value TEXT,
+                    added INTEGER DEFAULT 0,
+                    sent INTEGER DEFAULT 0,
+                    copies INTEGER DEFAULT 0,
+                    reports INTEGER DEFAULT 0,
+                    PRIMARY KEY (bucket, dimension, value)
+                ) WITHOUT ROWID
+            ''')
+        
+        async with db.execute('SELECT COUNT(*) FROM stats_totals') as cursor:
+            seeded = (await cursor.fetchone())[0] > 0
+        # Hourly buckets from before the quarter-hour split become the first quarter of their hour
+        await db.execute("UPDATE stats_hourly SET bucket = bucket || ':00' WHERE length(bucket) = 13")
+        
+        # Recreated on every start so existing databases pick up changes to the trigger bodies
+        for name, body in ROLLUP_TRIGGERS.items():
+            await db.execute(f'DROP TRIGGER IF EXISTS {name}')
+            await db.execute(f'CREATE TRIGGER {name} {body}')
+        
+        if not seeded:
+            await self._seed_rollups(db)
+    
+    async def _seed_rollups(self, db):
+        await db.execute('''
+            INSERT INTO stats_totals (key, value)
+            SELECT 'total_configs', COUNT(*) FROM configs
+            UNION ALL SELECT 'queue', COUNT(*) FROM configs WHERE message_id IS NULL
+            UNION ALL SELECT 'total_copies', COALESCE(SUM(copy_count), 0) FROM configs
+            UNION ALL SELECT 'total_reports', COALESCE(SUM(bad_reports), 0) FROM configs
+        ''')
+        
+        buckets = {'stats_hourly': QUARTER_BUCKET, 'stats_daily': 'date({ts})'}
+        for table, bucket in buckets.items():
+            for dimension, value in ROLLUP_DIMENSIONS:
+                value = value.format(row='configs')
+                for column, timestamp in (('added', 'created_at'), ('sent', 'sent_at')):
+                    await db.execute(f'''
+                        INSERT INTO {table} (bucket, dimension, value, {column})
+                        SELECT {bucket.format(ts=timestamp)} AS b, {dimension}, {value}, COUNT(*)
+                        FROM configs WHERE b IS NOT NULL
+                        GROUP BY b, {value}
+                        ON CONFLICT(bucket, dimension, value) DO UPDATE SET {column} = {column} + excluded.{column}
+                    ''')
+        logger.info("Seeded stats rollups from existing configs")
+    
+    async def prune_hourly_stats(self, days: int):
+        cutoff = (utc_now() - timedelta(days=days)).strftime('%Y-%m-%dT%H')
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute('DELETE FROM stats_hourly WHERE bucket < ?', (cutoff,))
+            await db.commit()
+    
+    async def _normalize_sent_at(self, db):
+        async with db.execute("SELECT value FROM settings WHERE key = 'sent_at_utc'") as cursor:
+            if await cursor.fetchone():
+                return
+        
+        # sent_at used to be naive server-local time; it is compared as text against UTC ISO bounds now
+        async with db.execute('''
+            SELECT id, sent_at FROM configs WHERE sent_at IS NOT NULL AND sent_at NOT LIKE '%+00:00'
+        ''') as cursor:
+            rows = await cursor.fetchall()
+        
+        utc = ZoneInfo('UTC')
+        updates = []
+        for config_id, sent_at in rows:
+            try:
+                moment = datetime.fromisoformat(str(sent_at))
+            except ValueError:
+                continue
+            updates.append((moment.astimezone(utc).isoformat(timespec='seconds'), config_id))
+        
+        await db.executemany('UPDATE configs SET sent_at = ? WHERE id = ?', updates)
+        await db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('sent_at_utc', '1')")
+        if updates:
+            logger.info(f"Converted {len(updates)} legacy sent_at values to UTC")
+    
+    async def _enable_incremental_vacuum(self, db):
+        async with db.execute('PRAGMA auto_vacuum') as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode == 2:
+            return
+        
+        await db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        async with db.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'") as cursor:
+            has_tables = (await cursor.fetchone())[0] > 0
+        if has_tables:
+            # auto_vacuum only takes effect on an existing file after a full rebuild, which happens once
+            logger.info("Rebuilding database to enable incremental vacuum")
+            await db.execute('VACUUM')
+    
+    async def archive_configs(self, archive_path: str, cutoff: str, limit: int) -> int:
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS archive.configs (
+                    id INTEGER PRIMARY KEY,
+                    uuid TEXT,
+                    type TEXT,
+                    link TEXT,
+                    location TEXT,
+                    source TEXT,
+                    fingerprint TEXT,
+                    channel_id TEXT,
+                    message_id INTEGER,
+                    bad_reports INTEGER,
+                    copy_count INTEGER,
+                    created_at TIMESTAMP,
+                    sent_at TIMESTAMP,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            async with db.execute('''
+                SELECT id FROM main.configs
+                WHERE message_id IS NOT NULL AND sent_at < ?
+                ORDER BY sent_at LIMIT ?
+            ''', (cutoff, limit)) as cursor:
+                ids = [row[0] for row in await cursor.fetchall()]
+            if not ids:
+                return 0
+            
+            placeholders = ','.join('?' * len(ids))
+            await db.execute(f'''
+                INSERT OR REPLACE INTO archive.configs
+                (id, uuid, type, link, location, source, fingerprint, channel_id, message_id,
+                 bad_reports, copy_count, created_at, sent_at)
+                SELECT id, uuid, type, link, location, source, fingerprint, channel_id, message_id,
+                       bad_reports, copy_count, created_at, sent_at
+                FROM main.configs WHERE id IN ({placeholders})
+            ''', ids)
+            await db.execute(f'DELETE FROM main.configs WHERE id IN ({placeholders})', ids)
+            
+            # The delete trigger lowers total_configs; archived rows still count towards it
+            await db.execute('''
+                UPDATE stats_totals SET value = value + ? WHERE key = 'total_configs'
+            ''', (len(ids),))
+            await db.execute('''
+                INSERT INTO stats_totals (key, value) VALUES ('archived_configs', ?)
+                ON CONFLICT(key) DO UPDATE SET value = value + excluded.value
+            ''', (len(ids),))
             await db.commit()
         
-        await self._init_default_settings()
+        self._changed()
+        return len(ids)
     
-    async def _init_default_settings(self):
+    async def incremental_vacuum(self, pages: int) -> int:
+        async with aiosqlite.connect(self.db_path) as db:
+            # sqlite3's execute() steps the pragma once, freeing a single page; executescript runs it to completion
+            await db.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+            async with db.execute('PRAGMA freelist_count') as cursor:
+                return (await cursor.fetchone())[0]
+    
+    async def _ensure_columns(self, db, table: str, columns: Dict[str, str]):
+        async with db.execute(f'PRAGMA table_info({table})') as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+        
+        for name, definition in columns.items():
+            if name not in existing:
+                await db.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+    
+    async def _init_default_settings(self, db):
         defaults = {
             'send_clients': 'true',
             'batch_size': '5',
@@ -83,32 +401,32 @@ class Database:
             'daily_limit': '200',
             'stop_sending': 'false',
             'total_configs': '0',
-            'last_renewal': ''
+            'last_renewal': '',
+            'sweeper_enabled': 'true',
+            'auto_send': 'false',
+            'digest_size': '0',
+            'digest_format': 'list',
+            'resume_send': '',
+            'refresh_pending': '',
+            'sweep_cursor': ''
         }
         
-        async with aiosqlite.connect(self.db_path) as db:
-            for key, value in defaults.items():
-                await db.execute('''
-                    INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
-                ''', (key, value))
-            await db.commit()
+        await db.executemany('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)', defaults.items())
     
-    async def sync_channels_from_env(self, channels: List[str]):
-        async with aiosqlite.connect(self.db_path) as db:
-            for ch in channels:
-                await db.execute('''
-                    INSERT OR IGNORE INTO channels (channel_id, channel_name)
-                    VALUES (?, ?)
-                ''', (ch, ch))
-            await db.commit()
+    async def _sync_channels(self, db, channels: List[str]):
+        await db.executemany(
+            'INSERT OR IGNORE INTO channels (channel_id, channel_name) VALUES (?, ?)',
+            [(ch, ch) for ch in channels]
+        )
     
-    async def add_config(self, cfg: Dict[str, Any]) -> int:
+    async def add_config(self, cfg: ConfigRecord) -> int:
         async with aiosqlite.connect(self.db_path) as db:
             cursor = await db.execute('''
                 INSERT INTO configs 
-                (uuid, type, link, server, port, location, ping, quality, source,
-                 channel_id, message_id, bad_reports, copy_count, sent_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (uuid, type, link, server, port, location, ping, quality, source, fingerprint,
+                 channel_id, message_id, bad_reports, copy_count, sent_at, render_hash,
+                 rendered_text, render_version, rendered_markup)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ON CONFLICT(uuid) DO UPDATE SET
                     type=excluded.type,
                     link=excluded.link,
@@ -118,31 +436,289 @@ class Database:
                     ping=excluded.ping,
                     quality=excluded.quality,
                     source=excluded.source,
+                    fingerprint=excluded.fingerprint,
                     channel_id=excluded.channel_id,
                     message_id=excluded.message_id,
-                    sent_at=excluded.sent_at
+                    sent_at=excluded.sent_at,
+                    render_hash=excluded.render_hash,
+                    rendered_text=excluded.rendered_text,
+                    render_version=excluded.render_version,
+                    rendered_markup=excluded.rendered_markup
+                RETURNING id
             ''', (
-                cfg.get('uuid'), cfg.get('type'), cfg.get('link'),
-                cfg.get('server'), cfg.get('port'), cfg.get('location'),
-                cfg.get('ping'), cfg.get('quality'), cfg.get('source'),
-                cfg.get('channel_id'), cfg.get('message_id'),
-                cfg.get('bad_reports', 0), cfg.get('copy_count', 0),
-                cfg.get('sent_at')
+                cfg.uuid, cfg.type, cfg.link,
+                cfg.server, cfg.port, cfg.location,
+                cfg.ping, cfg.quality, cfg.source, cfg.fingerprint,
+                cfg.channel_id, cfg.message_id,
+                cfg.bad_reports, cfg.copy_count,
+                cfg.sent_at, cfg.render_hash,
+                cfg.rendered_text, cfg.render_version, cfg.rendered_markup
             ))
+            row = await cursor.fetchone()
+            await cursor.close()
             await db.commit()
-            return cursor.lastrowid
+        if cfg.message_id:
+            self._changed()
+        return row[0]
     
-    async def get_config_by_uuid(self, uuid: str) -> Optional[Dict]:
+    async def add_configs(self, configs: List[ConfigRecord]) -> int:
+        if not configs:
+            return 0
+        added = 0
         async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute('SELECT * FROM configs WHERE uuid = ?', (uuid,)) as cursor:
+            # One statement per row, since executemany can't return rows; skipped duplicates keep id None
+            for cfg in configs:
+                async with db.execute('''
+                    INSERT INTO configs
+                    (uuid, type, link, server, port, location, ping, quality, source, fingerprint)
+                    SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                    WHERE NOT EXISTS (SELECT 1 FROM configs WHERE fingerprint = ?)
+                    RETURNING id
+                ''', (
+                    cfg.uuid, cfg.type, cfg.link, cfg.server, cfg.port, cfg.location,
+                    cfg.ping, cfg.quality, cfg.source, cfg.fingerprint, cfg.fingerprint
+                )) as cursor:
+                    row = await cursor.fetchone()
+                if row:
+                    cfg.id = row[0]
+                    added += 1
+            await db.commit()
+        return added
+    
+    async def iter_fingerprint_pages(self, page_size: int = 5000,
+                                     archive_path: Optional[str] = None) -> AsyncIterator[List[str]]:
+        async with aiosqlite.connect(self.db_path) as db:
+            tables = ['main.configs']
+            # Archived links were seen too; a rebuilt filter that forgets them would let them back into the queue
+            if archive_path and os.path.exists(archive_path):
+                await db.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+                async with db.execute("SELECT 1 FROM archive.sqlite_master WHERE name = 'configs'") as cursor:
+                    if await cursor.fetchone():
+                        tables.append('archive.configs')
+            
+            for table in tables:
+                last_id = 0
+                while True:
+                    async with db.execute(f'''
+                        SELECT id, fingerprint FROM {table}
+                        WHERE id > ? AND fingerprint IS NOT NULL
+                        ORDER BY id LIMIT ?
+                    ''', (last_id, page_size)) as cursor:
+                        rows = await cursor.fetchall()
+                    
+                    if not rows:
+                        break
+                    yield [row[1] for row in rows]
+                    last_id = rows[-1][0]
+    
+    async def get_stale_renders(self, version: str, after_id: int = 0, limit: int = 500) -> List[ConfigRecord]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = config_row_factory
+            async with db.execute(f'''
+                SELECT {CONFIG_SELECT} FROM configs
+                WHERE message_id IS NULL AND id > ? AND render_version IS NOT ?
+                ORDER BY id LIMIT ?
+            ''', (after_id, version, limit)) as cursor:
+                return await cursor.fetchall()
+    
+    async def set_rendered_texts(self, configs: List[ConfigRecord]):
+        if not configs:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany('''
+                UPDATE configs SET rendered_text = ?, render_version = ?, rendered_markup = ?, render_hash = ?
+                WHERE id = ? AND message_id IS NULL
+            ''', [
+                (cfg.rendered_text, cfg.render_version, cfg.rendered_markup, cfg.render_hash, cfg.id)
+                for cfg in configs
+            ])
+            await db.commit()
+    
+    async def get_config_by_uuid(self, uuid: str) -> Optional[ConfigRecord]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = config_row_factory
+            async with db.execute(f'SELECT {CONFIG_SELECT} FROM configs WHERE uuid = ?', (uuid,)) as cursor:
+                return await cursor.fetchone()
+    
+    async def get_configs_by_uuids(self, uuids: List[str]) -> List[ConfigRecord]:
+        if not uuids:
+            return []
+        placeholders = ','.join('?' * len(uuids))
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = config_row_factory
+            async with db.execute(
+                f'SELECT {CONFIG_SELECT} FROM configs WHERE uuid IN ({placeholders})', uuids
+            ) as cursor:
+                return await cursor.fetchall()
+    
+    async def set_render_hashes(self, hashes: Dict[str, str]):
+        if not hashes:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                'UPDATE configs SET render_hash = ? WHERE uuid = ?',
+                [(render_hash, uuid) for uuid, render_hash in hashes.items()]
+            )
+            await db.commit()
+    
+    async def get_config_by_id(self, config_id: int) -> Optional[ConfigRecord]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = config_row_factory
+            async with db.execute(f'SELECT {CONFIG_SELECT} FROM configs WHERE id = ?', (config_id,)) as cursor:
+                return await cursor.fetchone()
+    
+    async def get_configs_on_message(self, channel_id: str, message_id: int) -> List[ConfigRecord]:
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = config_row_factory
+            async with db.execute(
+                f'SELECT {CONFIG_SELECT} FROM configs WHERE channel_id = ? AND message_id = ? ORDER BY id',
+                (channel_id, message_id)
+            ) as cursor:
+                return await cursor.fetchall()
+    
+    async def get_shared_messages(self, uuids: List[str]) -> set:
+        if not uuids:
+            return set()
+        placeholders = ','.join('?' * len(uuids))
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(f'''
+                SELECT DISTINCT other.channel_id, other.message_id FROM configs AS target
+                JOIN configs AS other
+                    ON other.channel_id = target.channel_id AND other.message_id = target.message_id
+                WHERE target.uuid IN ({placeholders}) AND other.uuid NOT IN ({placeholders})
+            ''', (*uuids, *uuids)) as cursor:
+                return {(row[0], row[1]) for row in await cursor.fetchall()}
+    
+    async def record_digest_sent(self, configs: List[ConfigRecord]):
+        date = self.today()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany('''
+                UPDATE configs SET channel_id = ?, message_id = ?, sent_at = ?, render_hash = ?,
+                    rendered_text = NULL, rendered_markup = NULL
+                WHERE uuid = ?
+            ''', [(cfg.channel_id, cfg.message_id, cfg.sent_at, cfg.render_hash, cfg.uuid) for cfg in configs])
+            
+            async with db.execute('SELECT count, locations FROM daily_stats WHERE date = ?', (date,)) as cursor:
                 row = await cursor.fetchone()
-                return dict(row) if row else None
+            count, locations = (row[0], json.loads(row[1]) if row[1] else {}) if row else (0, {})
+            for cfg in configs:
+                loc_key = cfg.location.split()[-1] if ' ' in cfg.location else cfg.location
+                locations[loc_key] = locations.get(loc_key, 0) + 1
+            
+            await db.execute('''
+                INSERT INTO daily_stats (date, count, locations) VALUES (?, ?, ?)
+                ON CONFLICT(date) DO UPDATE SET count = excluded.count, locations = excluded.locations
+            ''', (date, count + len(configs), json.dumps(locations)))
+            await db.commit()
+        self._changed()
     
     async def delete_config(self, uuid: str):
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute('DELETE FROM configs WHERE uuid = ?', (uuid,))
             await db.commit()
+        self._changed()
+    
+    async def delete_configs(self, uuids: List[str]):
+        if not uuids:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany('DELETE FROM configs WHERE uuid = ?', [(u,) for u in uuids])
+            await db.commit()
+        self._changed()
+    
+    async def start_sweep(self):
+        # copy_count keeps changing during a pass, so a pass orders by a snapshot of it taken here
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute('UPDATE configs SET sweep_rank = copy_count WHERE message_id IS NOT NULL')
+            await db.commit()
+    
+    async def get_sweep_batch(self, cursor: Optional[List] = None, limit: int = 50) -> Tuple[List[ConfigRecord], Optional[List]]:
+        key = "substr(COALESCE(sent_at, ''), 1, 10), COALESCE(sweep_rank, 0), id"
+        query = f'''
+            SELECT {CONFIG_SELECT}, {key} FROM configs
+            WHERE message_id IS NOT NULL
+        '''
+        params = []
+        # Newest day first, most copied first within a day; every key column is fixed for the pass
+        if cursor:
+            query += f" AND ({key}) < (?, ?, ?)"
+            params.extend(cursor)
+        query += " ORDER BY substr(COALESCE(sent_at, ''), 1, 10) DESC, COALESCE(sweep_rank, 0) DESC, id DESC LIMIT ?"
+        params.append(limit)
+        
+        width = len(CONFIG_COLUMNS)
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(query, params) as cur:
+                rows = await cur.fetchall()
+        if not rows:
+            return [], None
+        return [ConfigRecord(*row[:width]) for row in rows], list(rows[-1][width:])
+    
+    async def record_probe_results(self, results: Dict[str, bool], threshold: int) -> List[str]:
+        if not results:
+            return []
+        now = utc_now().isoformat(timespec='seconds')
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany('''
+                UPDATE configs SET
+                    probe_failures = CASE WHEN ? THEN 0 ELSE probe_failures + 1 END,
+                    last_probed_at = ?
+                WHERE uuid = ?
+            ''', [(alive, now, uuid) for uuid, alive in results.items()])
+            await db.commit()
+            
+            placeholders = ','.join('?' * len(results))
+            async with db.execute(
+                f'SELECT uuid FROM configs WHERE probe_failures >= ? AND uuid IN ({placeholders})',
+                (threshold, *results.keys())
+            ) as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+    
+    async def update_pings(self, pings: Dict[str, tuple]):
+        if not pings:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                'UPDATE configs SET ping = ?, quality = ? WHERE uuid = ?',
+                [(ping, quality, uuid) for uuid, (ping, quality) in pings.items()]
+            )
+            await db.commit()
+    
+    async def get_live_links(self, protocol: str = '', location: str = '', max_reports: int = 0,
+                             limit: int = 200) -> List[str]:
+        query = 'SELECT link FROM configs WHERE message_id IS NOT NULL AND bad_reports <= ?'
+        params: List[Any] = [max_reports]
+        if protocol:
+            query += ' AND type = ?'
+            params.append(protocol)
+        if location:
+            query += " AND location LIKE ? ESCAPE '\\'"
+            params.append('%' + location.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        query += ' ORDER BY sent_at DESC LIMIT ?'
+        params.append(limit)
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(query, params) as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+    
+    async def get_watermarks(self) -> Dict[str, tuple]:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute('SELECT source, last_message_id, last_date FROM ingest_watermarks') as cursor:
+                return {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+    
+    async def update_watermarks(self, watermarks: Dict[str, tuple]):
+        if not watermarks:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany('''
+                INSERT INTO ingest_watermarks (source, last_message_id, last_date, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(source) DO UPDATE SET
+                    last_message_id = MAX(last_message_id, excluded.last_message_id),
+                    last_date = MAX(last_date, excluded.last_date),
+                    updated_at = CURRENT_TIMESTAMP
+            ''', [(source, message_id, date) for source, (message_id, date) in watermarks.items()])
+            await db.commit()
     
     async def get_channels(self) -> List[str]:
         async with aiosqlite.connect(self.db_path) as db:
@@ -170,6 +746,7 @@ class Database:
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute('UPDATE configs SET bad_reports = bad_reports + 1 WHERE uuid = ?', (uuid,))
             await db.commit()
+            self._changed()
             
             async with db.execute('SELECT bad_reports FROM configs WHERE uuid = ?', (uuid,)) as cursor:
                 row = await cursor.fetchone()
@@ -183,7 +760,7 @@ class Database:
     
     async def get_daily_stats(self, date: str = None) -> Dict:
         if not date:
-            date = datetime.now().strftime('%Y-%m-%d')
+            date = self.today()
         
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
@@ -219,7 +796,7 @@ class Database:
             await db.commit()
     
     async def increment_daily_count(self, location: str = None):
-        date = datetime.now().strftime('%Y-%m-%d')
+        date = self.today()
         stats = await self.get_daily_stats(date)
         stats['count'] += 1
         
@@ -229,62 +806,240 @@ class Database:
         
         await self.update_daily_stats(date, stats)
     
+    async def get_stats_totals(self) -> Dict[str, int]:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute('SELECT key, value FROM stats_totals') as cursor:
+                return {row[0]: row[1] for row in await cursor.fetchall()}
+    
+    async def get_rollup(self, start: datetime, end: Optional[datetime] = None, hourly: bool = True) -> Dict:
+        table, bucket = ('stats_hourly', quarter_bucket) if hourly else ('stats_daily', lambda moment: f"{moment:%Y-%m-%d}")
+        end = end or utc_now()
+        
+        rollup = {'added': 0, 'sent': 0, 'copies': 0, 'reports': 0, 'protocol': {}, 'location': {}}
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(f'''
+                SELECT dimension, value, SUM(added), SUM(sent), SUM(copies), SUM(reports)
+                FROM {table} WHERE bucket >= ? AND bucket <= ?
+                GROUP BY dimension, value
+            ''', (bucket(start), bucket(end))) as cursor:
+                async for dimension, value, added, sent, copies, reports in cursor:
+                    counts = {'added': added, 'sent': sent, 'copies': copies, 'reports': reports}
+                    if dimension == 'all':
+                        rollup.update(counts)
+                    else:
+                        rollup[dimension][value] = counts
+        return rollup
+    
+    async def get_report(self, days: int) -> Dict:
+        now = utc_now()
+        rollup = await self.get_rollup(now - timedelta(days=days), now, hourly=days <= 7)
+        rollup['days'] = days
+        return rollup
+    
     async def get_admin_stats(self) -> Dict:
+        totals = await self.get_stats_totals()
+        today = self.today()
+        start, end = local_day_bounds(self.tz, today)
+        rollup = await self.get_rollup(start, end - timedelta(seconds=1))
+        daily = await self.get_daily_stats(today)
+        
+        locations = {
+            (loc.split()[-1] if ' ' in loc else loc): counts['sent']
+            for loc, counts in rollup['location'].items() if counts['sent']
+        }
+        
+        return {
+            'today_configs': rollup['added'],
+            'total_configs': totals.get('total_configs', 0),
+            'queue': totals.get('queue', 0),
+            'archived_configs': totals.get('archived_configs', 0),
+            'today_copies': rollup['copies'],
+            'today_reports': rollup['reports'],
+            'total_copies': totals.get('total_copies', 0),
+            'total_reports': totals.get('total_reports', 0),
+            'new_members': daily['new_members'],
+            'total_members': await self.get_total_members(),
+            'locations': locations
+        }
+    
+    async def record_member_changes(self, changes: Dict[tuple, tuple]):
+        if not changes:
+            return
+        new_members = sum(joins for joins, _ in changes.values())
         async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            
-            async with db.execute('SELECT COUNT(*) FROM configs') as cursor:
-                total_configs = (await cursor.fetchone())[0]
-            
-            today = datetime.now().strftime('%Y-%m-%d')
-            async with db.execute('SELECT COUNT(*) FROM configs WHERE date(created_at) = ?', (today,)) as cursor:
-                today_configs = (await cursor.fetchone())[0]
-            
-            async with db.execute('SELECT SUM(copy_count), SUM(bad_reports) FROM configs') as cursor:
+            await db.executemany('''
+                INSERT INTO member_stats (bucket, channel_id, joins, leaves) VALUES (?, ?, ?, ?)
+                ON CONFLICT(bucket, channel_id) DO UPDATE SET
+                    joins = joins + excluded.joins,
+                    leaves = leaves + excluded.leaves
+            ''', [(bucket, channel_id, joins, leaves) for (bucket, channel_id), (joins, leaves) in changes.items()])
+            if new_members:
+                await db.execute('''
+                    INSERT INTO daily_stats (date, count, locations, new_members) VALUES (?, 0, '{}', ?)
+                    ON CONFLICT(date) DO UPDATE SET new_members = new_members + excluded.new_members
+                ''', (self.today(), new_members))
+            await db.commit()
+    
+    async def record_member_counts(self, bucket: str, counts: Dict[str, int]):
+        if not counts:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany('''
+                INSERT INTO member_stats (bucket, channel_id, member_count) VALUES (?, ?, ?)
+                ON CONFLICT(bucket, channel_id) DO UPDATE SET member_count = excluded.member_count
+            ''', [(bucket, channel_id, count) for channel_id, count in counts.items()])
+            await db.commit()
+    
+    async def get_total_members(self) -> int:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute('''
+                SELECT member_count, MAX(bucket) FROM member_stats
+                WHERE member_count IS NOT NULL GROUP BY channel_id
+            ''') as cursor:
+                return sum(row[0] for row in await cursor.fetchall())
+    
+    async def get_hourly_growth(self, start_bucket: str) -> Dict[str, tuple]:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute('''
+                SELECT bucket, SUM(joins), SUM(leaves), SUM(sent) FROM (
+                    SELECT bucket, joins, leaves, 0 AS sent FROM member_stats WHERE bucket >= ?
+                    UNION ALL
+                    SELECT substr(bucket, 1, 13), 0, 0, sent FROM stats_hourly WHERE dimension = 'all' AND bucket >= ?
+                ) GROUP BY bucket
+            ''', (start_bucket, start_bucket)) as cursor:
+                return {row[0]: (row[1], row[2], row[3]) for row in await cursor.fetchall()}
+    
+    async def get_queue_count(self) -> int:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT value FROM stats_totals WHERE key = 'queue'") as cursor:
                 row = await cursor.fetchone()
-                total_copies = row[0] or 0
-                total_reports = row[1] or 0
+                return row[0] if row else 0
+    
+    async def get_pending_configs(self, limit: int = None, mode: str = 'oldest') -> List[ConfigRecord]:
+        return [cfg async for cfg in self.iter_pending_configs(limit, mode)]
+    
+    async def iter_pending_configs(self, limit: int = None, mode: str = 'oldest',
+                                   page_size: int = 200) -> AsyncIterator[ConfigRecord]:
+        async with aiosqlite.connect(self.db_path) as db:
+            if mode == 'random':
+                pages = self._sample_pending(db, limit, page_size)
+            else:
+                pages = self._page_pending(db, limit, page_size)
             
-            async with db.execute('SELECT COUNT(*) FROM configs WHERE message_id IS NULL') as cursor:
-                queue_count = (await cursor.fetchone())[0]
+            async for page in pages:
+                for cfg in page:
+                    yield cfg
+    
+    async def _page_pending(self, db, limit: Optional[int], page_size: int):
+        db.row_factory = config_row_factory
+        last_id = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            async with db.execute(f'''
+                SELECT {CONFIG_SELECT} FROM configs
+                WHERE message_id IS NULL AND id > ?
+                ORDER BY id LIMIT ?
+            ''', (last_id, size)) as cursor:
+                page = await cursor.fetchall()
             
-            daily = await self.get_daily_stats(today)
+            if not page:
+                return
+            yield page
             
-            return {
-                'today_configs': today_configs,
-                'total_configs': total_configs,
-                'queue': queue_count,
-                'today_copies': daily['copy_count'],
-                'today_reports': daily['bad_reports'],
-                'total_copies': total_copies,
-                'total_reports': total_reports,
-                'locations': daily['locations']
-            }
+            last_id = page[-1].id
+            if remaining is not None:
+                remaining -= len(page)
     
-    async def get_queue_count(self) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute('SELECT COUNT(*) FROM configs WHERE message_id IS NULL') as cursor:
-                return (await cursor.fetchone())[0]
-    
-    async def get_pending_configs(self, limit: int = None) -> List[Dict]:
-        query = 'SELECT * FROM configs WHERE message_id IS NULL ORDER BY created_at'
-        if limit:
-            query += f' LIMIT {limit}'
+    async def _sample_pending(self, db, limit: Optional[int], page_size: int):
+        async with db.execute(
+            'SELECT MIN(id), MAX(id), COUNT(*) FROM configs WHERE message_id IS NULL'
+        ) as cursor:
+            low, high, total = await cursor.fetchone()
         
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute(query) as cursor:
+        if not total:
+            return
+        
+        db.row_factory = config_row_factory
+        wanted = total if limit is None else min(limit, total)
+        seen = set()
+        misses = 0
+        # Past half the queue most pivots land on rows already drawn, so a single scan is cheaper
+        sampling = wanted <= total * 0.5
+        
+        while sampling and len(seen) < wanted and misses < 3:
+            size = min(page_size, wanted - len(seen))
+            pivots = [random.randint(low, high) for _ in range(size)]
+            async with db.execute(f'''
+                WITH pivots(p) AS (VALUES {', '.join('(?)' for _ in pivots)})
+                SELECT {', '.join('c.' + col for col in CONFIG_SELECT.split(', '))}
+                FROM pivots JOIN configs c ON c.id = (
+                    SELECT id FROM configs
+                    WHERE message_id IS NULL AND id >= pivots.p
+                    ORDER BY id LIMIT 1
+                )
+            ''', pivots) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+            
+            page = []
+            for cfg in rows:
+                if cfg.id not in seen and len(seen) < wanted:
+                    seen.add(cfg.id)
+                    page.append(cfg)
+            
+            # Rows after wide id gaps are rarely hit, so a round of one pivot can miss indefinitely
+            misses = misses + 1 if len(page) < max(1, size // 2) else 0
+            if page:
+                yield page
+        
+        needed = wanted - len(seen)
+        if needed <= 0:
+            return
+        
+        # Reservoir-sample the rows not drawn yet so the remainder is still uniform, not the lowest ids
+        reservoir = []
+        scanned = 0
+        async for page in self._page_pending(db, None, page_size):
+            for cfg in page:
+                if cfg.id in seen:
+                    continue
+                scanned += 1
+                if len(reservoir) < needed:
+                    reservoir.append(cfg)
+                else:
+                    slot = random.randrange(scanned)
+                    if slot < needed:
+                        reservoir[slot] = cfg
+        
+        random.shuffle(reservoir)
+        for i in range(0, len(reservoir), page_size):
+            yield reservoir[i:i + page_size]
+    
+    async def get_server_report_counts(self, servers: List[str]) -> Dict[str, int]:
+        servers = list(set(servers))
+        counts = {}
+        async with aiosqlite.connect(self.db_path) as db:
+            for i in range(0, len(servers), 500):
+                chunk = servers[i:i + 500]
+                async with db.execute(f'''
+                    SELECT server, SUM(bad_reports + probe_failures) FROM configs
+                    WHERE message_id IS NOT NULL AND server IN ({','.join('?' * len(chunk))})
+                    GROUP BY server
+                ''', chunk) as cursor:
+                    counts.update({row[0]: row[1] or 0 for row in await cursor.fetchall()})
+        return counts
     
     async def get_daily_sent_count(self) -> int:
-        today = datetime.now().strftime('%Y-%m-%d')
+        start, end = local_day_bounds(self.tz)
         async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute('SELECT COUNT(*) FROM configs WHERE date(sent_at) = ?', (today,)) as cursor:
+            async with db.execute(
+                'SELECT COUNT(*) FROM configs WHERE sent_at >= ? AND sent_at < ?',
+                (start.isoformat(timespec='seconds'), end.isoformat(timespec='seconds'))
+            ) as cursor:
                 return (await cursor.fetchone())[0]
     
-    async def add_to_queue(self, configs: List[Dict]):
+    async def add_to_queue(self, configs: List[ConfigRecord]):
         async with aiosqlite.connect(self.db_path) as db:
             for cfg in configs:
-                await db.execute('INSERT OR IGNORE INTO queue (config_uuid) VALUES (?)', (cfg.get('uuid'),))
+                await db.execute('INSERT OR IGNORE INTO queue (config_uuid) VALUES (?)', (cfg.uuid,))
             await db.commit()
@@ -0,0 +1,234 @@
+import asyncio
+import csv
+import ipaddress
+import logging
+import os
+import socket
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import chain
+from typing import Optional, List, Dict
+
+from models import ConfigRecord
+
+logger = logging.getLogger(__name__)
+
+class GeoIPResolver:
+    def __init__(self, db_path: str = '', dns_cache_size: int = 4096, dns_timeout: float = 3,
+                 locations_path: str = '', dns_negative_ttl: float = 300):
+        self.db_path = db_path
+        self.locations_path = locations_path
+        self.dns_cache_size = dns_cache_size
+        self.dns_timeout = dns_timeout
+        self.dns_negative_ttl = dns_negative_ttl
+        self.dns_cache = OrderedDict()
+        self.codes = []
+        self.v4_starts = array('I')
+        self.v4_ends = array('I')
+        self.v4_codes = array('H')
+        self.v6_starts = []
+        self.v6_ends = []
+        self.v6_codes = array('H')
+        self.names = {}
+    
+    @property
+    def loaded(self) -> bool:
+        return bool(self.v4_starts or self.v6_starts)
+    
+    def set_names(self, location_flags: Dict[str, str]):
+        for name, flag in location_flags.items():
+            self.names.setdefault(flag, name)
+    
+    def load(self):
+        paths = [path.strip() for path in self.db_path.split(',') if path.strip()]
+        if not paths:
+            logger.info("GeoIP database not configured, using text-based locations")
+            return
+        
+        code_index = {}
+        v4, v6 = [], []
+        geonames = None
+        
+        for path in paths:
+            if not os.path.exists(path):
+                logger.warning("GeoIP database %s not found", path)
+                continue
+            
+            with open(path, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                first = next(reader, None)
+                if first is None:
+                    continue
+                # GeoLite2 blocks files start with a header and map networks to geoname ids, not country codes
+                header = [column.strip() for column in first]
+                if 'geoname_id' in header:
+                    if geonames is None:
+                        geonames = self._load_geonames(path)
+                    rows = self._geoname_rows(reader, header, geonames)
+                elif header[0] == 'network':
+                    rows = reader
+                else:
+                    rows = chain([first], reader)
+                
+                for row in rows:
+                    try:
+                        if len(row) >= 3 and '/' not in row[0]:
+                            (version, start), (_, end), code = self._parse_ip(row[0]), self._parse_ip(row[1]), row[2]
+                        else:
+                            network = ipaddress.ip_network(row[0].strip(), strict=False)
+                            code = row[1]
+                            version = network.version
+                            start, end = int(network.network_address), int(network.broadcast_address)
+                    except (ValueError, IndexError):
+                        continue
+                    
+                    code = code.strip().upper()
+                    if len(code) != 2 or code == 'ZZ':
+                        continue
+                    
+                    idx = code_index.setdefault(code, len(code_index))
+                    (v4 if version == 4 else v6).append((start, end, idx))
+        
+        if not v4 and not v6:
+            logger.warning("GeoIP database %s has no usable ranges, using text-based locations", self.db_path)
+        
+        v4.sort()
+        v6.sort()
+        self.codes = list(code_index)
+        self.v4_starts = array('I', (r[0] for r in v4))
+        self.v4_ends = array('I', (r[1] for r in v4))
+        self.v4_codes = array('H', (r[2] for r in v4))
+        self.v6_starts = [r[0] for r in v6]
+        self.v6_ends = [r[1] for r in v6]
+        self.v6_codes = array('H', (r[2] for r in v6))
+        logger.info("GeoIP loaded: %s IPv4 and %s IPv6 ranges", len(v4), len(v6))
+    
+    def _load_geonames(self, blocks_path: str) -> Dict[str, str]:
+        path = self.locations_path
+        if not path:
+            folder = os.path.dirname(blocks_path) or '.'
+            candidates = sorted(name for name in os.listdir(folder) if name.endswith('.csv') and '-Locations-' in name)
+            # Prefer the English file; every locale carries the same country_iso_code column
+            candidates.sort(key=lambda name: not name.endswith('-en.csv'))
+            path = os.path.join(folder, candidates[0]) if candidates else ''
+        if not path or not os.path.exists(path):
+            logger.warning("GeoIP file %s uses geoname ids but no locations CSV was found, set GEOIP_LOCATIONS_PATH", blocks_path)
+            return {}
+        
+        with open(path, newline='', encoding='utf-8') as f:
+            return {
+                row['geoname_id']: row['country_iso_code']
+                for row in csv.DictReader(f)
+                if row.get('geoname_id') and row.get('country_iso_code')
+            }
+    
+    @staticmethod
+    def _geoname_rows(reader, header: List[str], geonames: Dict[str, str]):
+        network_col = header.index('network')
+        id_cols = [header.index(name) for name in ('geoname_id', 'registered_country_geoname_id') if name in header]
+        for row in reader:
+            try:
+                geoname_id = next((row[col] for col in id_cols if row[col]), '')
+            except IndexError:
+                continue
+            code = geonames.get(geoname_id)
+            if code:
+                yield row[network_col], code
+    
+    def _parse_ip(self, value: str):
+        value = value.strip()
+        if value.isdigit():
+            addr = ipaddress.ip_address(int(value))
+            return addr.version, int(addr)
+        try:
+            return 4, int.from_bytes(socket.inet_aton(value), 'big')
+        except OSError:
+            return 6, int(ipaddress.IPv6Address(value))
+    
+    def lookup_ip(self, ip: str) -> Optional[str]:
+        try:
+            version, value = self._parse_ip(ip)
+        except ValueError:
+            return None
+        
+        if version == 4:
+            starts, ends, codes = self.v4_starts, self.v4_ends, self.v4_codes
+        else:
+            starts, ends, codes = self.v6_starts, self.v6_ends, self.v6_codes
+        
+        pos = bisect_right(starts, value) - 1
+        if pos >= 0 and value <= ends[pos]:
+            return self.codes[codes[pos]]
+        return None
+    
+    async def resolve_host(self, host: str) -> Optional[str]:
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+        
+        cached = self.dns_cache.get(host)
+        if cached is not None:
+            ip, expires = cached
+            if expires is None or expires > time.monotonic():
+                self.dns_cache.move_to_end(host)
+                return ip
+        
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, None, type=socket.SOCK_STREAM),
+                timeout=self.dns_timeout
+            )
+            ip = infos[0][4][0] if infos else None
+        except (OSError, asyncio.TimeoutError):
+            ip = None
+        
+        # Failed lookups are retried after dns_negative_ttl instead of being remembered until evicted
+        self.dns_cache[host] = (ip, None if ip else time.monotonic() + self.dns_negative_ttl)
+        self.dns_cache.move_to_end(host)
+        if len(self.dns_cache) > self.dns_cache_size:
+            self.dns_cache.popitem(last=False)
+        return ip
+    
+    async def locate(self, host: str) -> Optional[str]:
+        if not self.loaded or not host:
+            return None
+        ip = await self.resolve_host(host)
+        return self.lookup_ip(ip) if ip else None
+    
+    def format_location(self, code: str) -> str:
+        flag = ''.join(chr(0x1F1E6 + ord(c) - ord('A')) for c in code)
+        return f"{flag} {self.names.get(flag, code)}"
+    
+    async def annotate(self, configs: List[ConfigRecord], concurrency: int = 50):
+        if not self.loaded or not configs:
+            return
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def locate(host):
+            async with semaphore:
+                return host, await self.locate(host)
+        
+        located = {}
+        hostnames = set()
+        for cfg in configs:
+            host = cfg.server
+            if not host or host == 'unknown' or host in located:
+                continue
+            code = self.lookup_ip(host)
+            if code:
+                located[host] = code
+            else:
+                hostnames.add(host)
+        
+        located.update(await asyncio.gather(*(locate(host) for host in hostnames)))
+        
+        for cfg in configs:
+            code = located.get(cfg.server)
+            if code:
+                cfg.location = self.format_location(code)
@@ -0,0 +1,353 @@
+import asyncio
+import codecs
+import json
+import logging
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Iterator, List, Dict, Optional
+
+from models import ConfigRecord
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+@dataclass(slots=True)
+class ExportMessage:
+    source: str
+    message_id: int
+    date: str
+    text: str
+
+def _is_seen(watermarks: Optional[Dict[str, tuple]], source: str, message_id: int, date: str) -> bool:
+    if not watermarks or source not in watermarks:
+        return False
+    last_id, last_date = watermarks[source]
+    if message_id:
+        return message_id <= last_id
+    return bool(date and last_date and date <= last_date)
+
+class _ExportTarget:
+    MESSAGE_ID = re.compile(r'^message(\d+)$')
+    BREAK_TAGS = {'br', 'div', 'p', 'li', 'tr', 'pre', 'blockquote'}
+    
+    def __init__(self, source: str = '', watermarks: Optional[Dict[str, tuple]] = None):
+        self.source = source
+        self.watermarks = watermarks
+        self.skipped = 0
+        self.skipping = False
+        self.ready = []
+        self.depth = 0
+        self.message_depth = None
+        self.header_depth = None
+        self.message_id = 0
+        self.date = ''
+        self.parts = []
+        self.header_parts = []
+        self.loose_parts = []
+        self.seen_messages = False
+    
+    def start(self, tag, attrib):
+        if tag != 'div':
+            return
+        
+        self.depth += 1
+        classes = attrib.get('class', '').split()
+        if self.message_depth is not None:
+            if not self.skipping and 'date' in classes and attrib.get('title'):
+                self.date = _parse_export_date(attrib['title'])
+            return
+        
+        match = self.MESSAGE_ID.match(attrib.get('id', ''))
+        if match and 'message' in classes:
+            self.message_depth = self.depth
+            self.message_id = int(match.group(1))
+            self.skipping = _is_seen(self.watermarks, self.source, self.message_id, '')
+            self.date = ''
+            self.parts = []
+            self.seen_messages = True
+            self.loose_parts = []
+        elif self.header_depth is None and 'page_header' in classes:
+            self.header_depth = self.depth
+            self.header_parts = []
+    
+    def end(self, tag):
+        if tag in self.BREAK_TAGS:
+            self.data('\n')
+        if tag != 'div':
+            return
+        
+        if self.message_depth == self.depth:
+            if self.skipping:
+                self.skipped += 1
+            else:
+                self.ready.append(ExportMessage(self.source, self.message_id, self.date, ''.join(self.parts)))
+            self.message_depth = None
+            self.skipping = False
+            self.parts = []
+        elif self.header_depth == self.depth:
+            header = ' '.join(''.join(self.header_parts).split())
+            if header:
+                self.source = header
+            self.header_depth = None
+        self.depth -= 1
+    
+    def data(self, text):
+        if self.message_depth is not None:
+            if not self.skipping:
+                self.parts.append(text)
+        elif self.header_depth is not None:
+            self.header_parts.append(text)
+        elif not self.seen_messages:
+            self.loose_parts.append(text)
+    
+    def close(self):
+        if not self.seen_messages and self.loose_parts:
+            self.ready.append(ExportMessage(self.source, 0, '', ''.join(self.loose_parts)))
+            self.loose_parts = []
+    
+    def drain(self) -> List[ExportMessage]:
+        ready, self.ready = self.ready, []
+        return ready
+
+def _parse_export_date(value: str) -> str:
+    try:
+        return datetime.strptime(value[:19], '%d.%m.%Y %H:%M:%S').isoformat()
+    except ValueError:
+        return value
+
+def iter_html_messages(stream: BinaryIO, source: str = '',
+                       watermarks: Optional[Dict[str, tuple]] = None) -> Iterator[ExportMessage]:
+    # lxml is only needed once an HTML export arrives, so it stays out of the startup path
+    from lxml import etree
+    
+    target = _ExportTarget(source, watermarks)
+    chunk = stream.read(CHUNK_SIZE)
+    if not chunk:
+        return 0
+    
+    declared = chunk.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) \
+        or b'charset' in chunk[:2048].lower()
+    parser = etree.HTMLParser(target=target, encoding=None if declared else 'utf-8')
+    
+    while chunk:
+        parser.feed(chunk)
+        yield from target.drain()
+        chunk = stream.read(CHUNK_SIZE)
+    
+    parser.close()
+    yield from target.drain()
+    return target.skipped
+
+def _flatten_text(text) -> str:
+    if isinstance(text, str):
+        return text
+    if isinstance(text, list):
+        return ''.join(part if isinstance(part, str) else str(part.get('text', '')) for part in text)
+    return ''
+
+def _json_message(obj, source: str) -> Optional[ExportMessage]:
+    if not isinstance(obj, dict) or obj.get('type', 'message') != 'message':
+        return None
+    try:
+        message_id = int(obj.get('id', 0))
+    except (TypeError, ValueError):
+        message_id = 0
+    return ExportMessage(source, message_id, str(obj.get('date', '')), _flatten_text(obj.get('text')))
+
+class _StreamBuffer:
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.eof = False
+    
+    def refill(self, keep_from: int) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(CHUNK_SIZE)
+        self.eof = not chunk
+        self.text = self.text[keep_from:] + self.decoder.decode(chunk, final=self.eof)
+        return True
+
+def iter_json_messages(stream: BinaryIO, source: str = '',
+                       watermarks: Optional[Dict[str, tuple]] = None) -> Iterator[ExportMessage]:
+    key_pattern = re.compile(r'"(name|messages)"\s*:\s*')
+    decoder = json.JSONDecoder()
+    buf = _StreamBuffer(stream)
+    pos = 0
+    in_array = False
+    skipped = 0
+    
+    while True:
+        text = buf.text
+        
+        if not in_array:
+            match = key_pattern.search(text, pos)
+            if not match or match.end() >= len(text):
+                keep_from = match.start() if match else max(pos, len(text) - 32)
+                if not buf.refill(keep_from):
+                    return skipped
+                pos = 0
+                continue
+            
+            if match.group(1) == 'name':
+                try:
+                    value, pos = decoder.raw_decode(text, match.end())
+                except json.JSONDecodeError:
+                    if not buf.refill(match.start()):
+                        return skipped
+                    pos = 0
+                    continue
+                if isinstance(value, str):
+                    source = value
+            else:
+                pos = match.end()
+                if text[pos] == '[':
+                    in_array = True
+                    pos += 1
+            continue
+        
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(text):
+            if not buf.refill(pos):
+                return skipped
+            pos = 0
+            continue
+        
+        if text[pos] == ']':
+            in_array = False
+            pos += 1
+            continue
+        
+        try:
+            obj, end = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            if not buf.refill(pos):
+                return skipped
+            pos = 0
+            continue
+        
+        pos = end
+        message = _json_message(obj, source)
+        if not message:
+            continue
+        if _is_seen(watermarks, message.source, message.message_id, message.date):
+            skipped += 1
+            continue
+        yield message
+
+class Ingestor:
+    MEMBER_TYPES = {'.html': 'html', '.htm': 'html', '.json': 'json'}
+    
+    def __init__(self, db, processor, geoip, config, fingerprints=None, renderer=None):
+        self.db = db
+        self.processor = processor
+        self.geoip = geoip
+        self.config = config
+        self.fingerprints = fingerprints
+        self.renderer = renderer
+    
+    def member_kind(self, name: str) -> Optional[str]:
+        lowered = name.lower()
+        for suffix, kind in self.MEMBER_TYPES.items():
+            if lowered.endswith(suffix):
+                return kind
+        return None
+    
+    async def ingest(self, source: BinaryIO, filename: str) -> Dict[str, int]:
+        stats = {'members': 0, 'messages': 0, 'skipped': 0, 'found': 0, 'known': 0, 'added': 0}
+        semaphore = asyncio.Semaphore(self.config.INGEST_WORKERS)
+        watermarks = await self.db.get_watermarks()
+        seen: Dict[str, tuple] = {}
+        
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(source) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir() and self.member_kind(info.filename)
+                ]
+                if sum(info.file_size for info in members) > self.config.MAX_EXPORT_SIZE:
+                    raise ValueError("حجم فایل‌های داخل آرشیو بیش از حد مجاز است")
+                
+                await asyncio.gather(*(
+                    self._ingest_member(
+                        lambda info=info: archive.open(info), info.filename,
+                        watermarks, seen, stats, semaphore
+                    )
+                    for info in members
+                ))
+        elif self.member_kind(filename):
+            await self._ingest_member(lambda: source, filename, watermarks, seen, stats, semaphore)
+        else:
+            raise ValueError(f"نوع فایل پشتیبانی نمی‌شود: {filename}")
+        
+        await self.db.update_watermarks(seen)
+        if self.fingerprints:
+            await asyncio.to_thread(self.fingerprints.flush)
+        logger.info(f"Ingested {filename}: {stats}")
+        return stats
+    
+    async def _ingest_member(self, opener, name: str, watermarks: Dict[str, tuple], seen: Dict[str, tuple],
+                             stats: Dict[str, int], semaphore: asyncio.Semaphore):
+        async with semaphore:
+            configs, message_count, skipped, highest = await asyncio.to_thread(
+                self._parse_member, opener, name, watermarks
+            )
+        
+        stats['members'] += 1
+        stats['messages'] += message_count
+        stats['skipped'] += skipped
+        stats['found'] += len(configs)
+        for source, (message_id, date) in highest.items():
+            last_id, last_date = seen.get(source, (0, ''))
+            seen[source] = (max(last_id, message_id), max(last_date, date))
+        
+        if self.fingerprints:
+            fresh = [cfg for cfg in configs if cfg.fingerprint not in self.fingerprints]
+            stats['known'] += len(configs) - len(fresh)
+            configs = fresh
+        
+        chunk_size = self.config.INGEST_CHUNK_SIZE
+        for i in range(0, len(configs), chunk_size):
+            chunk = configs[i:i + chunk_size]
+            await self.geoip.annotate(chunk)
+            added = await self.db.add_configs(chunk)
+            stats['added'] += added
+            if self.renderer and added:
+                # Rendered after geoip so the text carries the resolved location, and after insert so buttons have ids
+                inserted = [cfg for cfg in chunk if cfg.id is not None]
+                await asyncio.to_thread(self.renderer.prerender, inserted)
+                await self.db.set_rendered_texts(inserted)
+            if self.fingerprints:
+                self.fingerprints.add_many(cfg.fingerprint for cfg in chunk)
+    
+    def _parse_member(self, opener, name: str, watermarks: Dict[str, tuple]):
+        kind = self.member_kind(name)
+        configs: List[ConfigRecord] = []
+        highest: Dict[str, tuple] = {}
+        message_count = 0
+        
+        with opener() as stream:
+            if kind == 'json':
+                messages = iter_json_messages(stream, watermarks=watermarks)
+            else:
+                messages = iter_html_messages(stream, watermarks=watermarks)
+            
+            while True:
+                try:
+                    message = next(messages)
+                except StopIteration as stop:
+                    skipped = stop.value or 0
+                    break
+                
+                message_count += 1
+                if message.source:
+                    last_id, last_date = highest.get(message.source, (0, ''))
+                    highest[message.source] = (max(last_id, message.message_id), max(last_date, message.date))
+                configs.extend(self.processor.extract_from_text(message.text))
+        
+        return configs, message_count, skipped, highest
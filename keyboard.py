@@ -1,5 +1,9 @@
+from typing import List
+
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
 
+from callbacks import encode
+
 class Keyboard:
     @staticmethod
     def main_menu():
@@ -17,10 +21,20 @@ class Keyboard:
             [InlineKeyboardButton("⏱️ فاصله ارسال", callback_data='set_interval'), InlineKeyboardButton("🔢 تعداد batch", callback_data='set_batch')],
             [InlineKeyboardButton("⏳ تأخیر", callback_data='set_delay'), InlineKeyboardButton("📊 محدودیت روزانه", callback_data='set_daily_limit')],
             [InlineKeyboardButton("✅/❌ ارسال کلاینت‌ها", callback_data='toggle_clients'), InlineKeyboardButton("✅/❌ یادآوری", callback_data='toggle_reminder')],
+            [InlineKeyboardButton("✅/❌ ارسال خودکار", callback_data='toggle_auto_send')],
+            [InlineKeyboardButton("🗂️ حالت دایجست", callback_data='cycle_digest'), InlineKeyboardButton("📄 لیست/فایل", callback_data='toggle_digest_format')],
             [InlineKeyboardButton("📢 مدیریت کانال‌ها", callback_data='manage_channels')],
             [InlineKeyboardButton("🔙 بازگشت", callback_data='main_menu')]
         ])
     
+    @staticmethod
+    def stats_menu():
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton("📈 گزارش ۷ روزه", callback_data='rollup_7'), InlineKeyboardButton("📈 گزارش ۳۰ روزه", callback_data='rollup_30')],
+            [InlineKeyboardButton("👥 رشد اعضا", callback_data='growth_7')],
+            [InlineKeyboardButton("🔙 بازگشت", callback_data='main_menu')]
+        ])
+    
     @staticmethod
     def manual_send_menu():
         return InlineKeyboardMarkup([
@@ -30,19 +44,29 @@ class Keyboard:
         ])
     
     @staticmethod
-    def config_buttons(uuid: str):
+    def config_buttons(config_id: int):
         return InlineKeyboardMarkup([
             [
-                InlineKeyboardButton("📋 کپی", callback_data=f'copy_{uuid}'),
-                InlineKeyboardButton("🔴 گزارش خرابی", callback_data=f'report_{uuid}')
+                InlineKeyboardButton("📋 کپی", callback_data=encode('copy', config_id)),
+                InlineKeyboardButton("🔴 گزارش خرابی", callback_data=encode('report', config_id))
             ]
         ])
     
     @staticmethod
-    def confirm_report(uuid: str):
+    def digest_buttons(config_ids: List[int]):
         return InlineKeyboardMarkup([
-            [InlineKeyboardButton("✅ بله، کار نمی‌کند", callback_data=f'confirm_report_{uuid}')],
-            [InlineKeyboardButton("❌ خیر، اشتباه کردم", callback_data=f'cancel_report_{uuid}')]
+            [
+                InlineKeyboardButton(f"📋 کپی {i}", callback_data=encode('copy', config_id)),
+                InlineKeyboardButton(f"🔴 گزارش {i}", callback_data=encode('report', config_id))
+            ]
+            for i, config_id in enumerate(config_ids, 1)
+        ])
+    
+    @staticmethod
+    def confirm_report(config_id: int):
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton("✅ بله، کار نمی‌کند", callback_data=encode('confirm_report', config_id))],
+            [InlineKeyboardButton("❌ خیر، اشتباه کردم", callback_data=encode('cancel_report', config_id))]
         ])
     
     @staticmethod
@@ -50,8 +74,9 @@ class Keyboard:
         return InlineKeyboardMarkup([[InlineKeyboardButton("🔙 بازگشت", callback_data='main_menu')]])
     
     @staticmethod
-    def clients_menu():
-        return InlineKeyboardMarkup([
+    def clients_menu(subscription_url: str = ''):
+        subscription = [[InlineKeyboardButton("🔗 لینک سابسکریپشن", url=subscription_url)]] if subscription_url else []
+        return InlineKeyboardMarkup(subscription + [
             [InlineKeyboardButton("📱 v2rayNG", url='https://play.google.com/store/apps/details?id=com.v2ray.ang')],
             [InlineKeyboardButton("📱 Streisand", url='https://apps.apple.com/app/streisand/id6450534064')],
             [InlineKeyboardButton("📱 V2RayN", url='https://github.com/2dust/v2rayN/releases')],
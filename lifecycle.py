@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from logs import stop_logging
+
+logger = logging.getLogger(__name__)
+
+RESTART_ENV = 'NONECORE_RESTART_AT'
+
+class Lifecycle:
+    def __init__(self, config, launched_at: Optional[float] = None):
+        self.config = config
+        self.launched_at = launched_at
+        self.application = None
+        self.stopping = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.active_sends = 0
+        self.restart_requested = False
+        self.requested_at: Optional[float] = None
+        self.restarted_at = self._pop_restart_time()
+    
+    @staticmethod
+    def _pop_restart_time() -> Optional[float]:
+        value = os.environ.pop(RESTART_ENV, None)
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+    
+    @property
+    def is_stopping(self) -> bool:
+        return self.stopping.is_set()
+    
+    def request_stop(self, restart: bool = False):
+        if self.is_stopping:
+            return
+        
+        logger.info(f"{'Restart' if restart else 'Shutdown'} requested, draining sender")
+        self.restart_requested = restart
+        self.requested_at = time.time()
+        self.stopping.set()
+        if self.application:
+            self.application.stop_running()
+    
+    async def sleep(self, seconds: float) -> bool:
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=seconds)
+            return False
+        except asyncio.TimeoutError:
+            return True
+    
+    @asynccontextmanager
+    async def sending(self):
+        self.active_sends += 1
+        self.idle.clear()
+        try:
+            yield
+        finally:
+            self.active_sends -= 1
+            if not self.active_sends:
+                self.idle.set()
+    
+    async def drain(self) -> bool:
+        try:
+            await asyncio.wait_for(self.idle.wait(), timeout=self.config.SHUTDOWN_TIMEOUT)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.active_sends} send batches still running after {self.config.SHUTDOWN_TIMEOUT}s")
+            return False
+    
+    def record_send(self) -> Optional[float]:
+        if self.restarted_at is None:
+            return None
+        elapsed = time.time() - self.restarted_at
+        self.restarted_at = None
+        logger.info(f"First config sent {elapsed:.2f}s after restart was requested")
+        return elapsed
+    
+    def record_update(self) -> Optional[float]:
+        if self.launched_at is None:
+            return None
+        elapsed = time.time() - self.launched_at
+        self.launched_at = None
+        logger.info(f"First update handled {elapsed:.2f}s after launch")
+        return elapsed
+    
+    def reexec(self):
+        os.environ[RESTART_ENV] = str(self.requested_at or time.time())
+        logger.info("Re-executing bot process")
+        stop_logging()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
@@ -0,0 +1,123 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+_context: ContextVar[Dict[str, object]] = ContextVar('log_context', default={})
+
+CONTEXT_FIELDS = ('update_id', 'config_uuid', 'config_uuids')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+@contextmanager
+def log_context(**fields):
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _context.get().items():
+            setattr(record, key, value)
+        return True
+
+# Lets one record per sample key through each interval and tags it with how many were dropped since
+class SamplingFilter(logging.Filter):
+    def __init__(self, interval: float, sampled_loggers=()):
+        super().__init__()
+        self.interval = interval
+        self.sampled_loggers = set(sampled_loggers)
+        self.windows: Dict[str, list] = {}
+        self.lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample', None)
+        if key is None and record.name in self.sampled_loggers and record.levelno < logging.WARNING:
+            key = record.name
+        if key is None or self.interval <= 0:
+            return True
+        
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window and now - window[0] < self.interval:
+                window[1] += 1
+                return False
+            suppressed = window[1] if window else 0
+            self.windows[key] = [now, 0]
+        
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key in CONTEXT_FIELDS + ('suppressed',):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class LazyQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, leave msg % args for the listener thread to format.
+        # Tracebacks are rendered here because they can't outlive the frame safely.
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener: Optional[QueueListener] = None
+
+def stop_logging():
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+def setup_logging(config) -> QueueListener:
+    global _listener
+    if _listener:
+        return _listener
+    
+    stream = logging.StreamHandler()
+    if config.LOG_FORMAT == 'json':
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+    
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = LazyQueueHandler(records)
+    handler.addFilter(SamplingFilter(config.LOG_SAMPLE_INTERVAL, config.LOG_SAMPLED_LOGGERS))
+    handler.addFilter(ContextFilter())
+    
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG if config.DEBUG else getattr(logging, config.LOG_LEVEL.upper(), logging.INFO))
+    
+    _listener = QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
@@ -1,15 +1,18 @@
-import os
-import sys
+import json
+import time
+import signal
 import asyncio
 import logging
-import random
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from io import BytesIO
+from typing import List, Dict, Any, Optional, Union
 
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+# Taken before the third-party imports below so the startup timings include them
+LAUNCHED_AT = time.time()
+
+from telegram import Update, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, CallbackQueryHandler,
-    ConversationHandler, ContextTypes, filters
+    ConversationHandler, ChatMemberHandler, TypeHandler, ContextTypes, filters
 )
 
 from config import Config
@@ -17,32 +20,165 @@ from database import Database
 from processor import ConfigProcessor
 from sender import Sender
 from keyboard import Keyboard
+from models import ConfigRecord
+from sweeper import Sweeper
+from geoip import GeoIPResolver
+from ingest import Ingestor
+from bloom import FingerprintFilter
+from scheduler import SendScheduler
+from send_calendar import SendCalendar, batch_width, daily_room, utc_now
+from refresher import MessageRefresher, DIGEST_RENDER
+from members import MemberTracker
+from callbacks import CallbackRouter
+from lifecycle import Lifecycle
+from subscription import SubscriptionServer
+from retention import Retention
+from backup import BackupManager
+from profiler import Profiler
+from simulator import SendSimulator, SimulationSettings
+from logs import setup_logging, log_context
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO if not Config.DEBUG else logging.DEBUG
-)
 logger = logging.getLogger(__name__)
 
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SIZES = [0, 5, 10]
+
 # States for ConversationHandler
 SET_INTERVAL, SET_BATCH, SET_DELAY, SET_DAILY_LIMIT, CUSTOM_SEND = range(5)
 
+class ContextApplication(Application):
+    # Scopes update_id to one update; the non-concurrent fetcher task would otherwise keep it for every later record
+    async def process_update(self, update: object) -> None:
+        with log_context(update_id=getattr(update, 'update_id', None)):
+            await super().process_update(update)
+
 class NonecoreBot:
     def __init__(self):
         self.config = Config()
-        self.db = Database(self.config.DATABASE_PATH)
+        self.db = Database(self.config.DATABASE_PATH, self.config.TIMEZONE)
         self.processor = ConfigProcessor()
         self.sender = Sender(self.config)
         self.keyboard = Keyboard()
+        self.geoip = GeoIPResolver(
+            self.config.GEOIP_DB_PATH, self.config.DNS_CACHE_SIZE, self.config.DNS_TIMEOUT,
+            self.config.GEOIP_LOCATIONS_PATH, self.config.DNS_NEGATIVE_TTL
+        )
+        self.geoip.set_names(ConfigProcessor.LOCATION_FLAGS)
+        self.fingerprints = FingerprintFilter(
+            self.config.FINGERPRINT_FILTER_PATH, self.config.FINGERPRINT_CAPACITY, self.config.FINGERPRINT_ERROR_RATE
+        )
+        self.refresher = MessageRefresher(self.db, self.sender, self.keyboard, self.config)
+        self.ingestor = Ingestor(self.db, self.processor, self.geoip, self.config, self.fingerprints, self.refresher)
+        self.scheduler = SendScheduler(self.config)
+        self.calendar = SendCalendar(self.config)
+        self.sweeper = Sweeper(self.db, self.config, self.refresher)
+        self.members = MemberTracker(self.db, self.config)
+        self.retention = Retention(self.db, self.config)
+        self.backups = BackupManager(self.db, self.config)
+        self.profiler = Profiler(self.config)
+        self.simulator = SendSimulator(self.config)
+        self.router = self.build_router()
+        self.lifecycle = Lifecycle(self.config, LAUNCHED_AT)
+        self.subscription = SubscriptionServer(self.db, self.config)
         self.application = None
+        self.background_tasks = []
+        # Held from picking pending configs until they are posted, so concurrent sends can't pick the same rows
+        self.send_lock = asyncio.Lock()
     
     async def init(self):
-        await self.db.init()
-        await self.db.sync_channels_from_env(self.config.CHANNELS)
+        await self.db.init(self.config.CHANNELS)
         logger.info("Database initialized")
+        await asyncio.to_thread(self.geoip.load)
+        await self.load_fingerprints()
+    
+    async def load_fingerprints(self):
+        await asyncio.to_thread(self.fingerprints.open)
+        if not self.fingerprints.created:
+            return
+        
+        async for page in self.db.iter_fingerprint_pages(archive_path=self.config.ARCHIVE_DATABASE_PATH):
+            self.fingerprints.add_many(page)
+        await asyncio.to_thread(self.fingerprints.flush)
+        logger.info(f"Fingerprint filter seeded with {self.fingerprints.count} links from the database and archive")
+    
+    async def post_init(self, application: Application):
+        await self.init()
+        self.lifecycle.application = application
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.lifecycle.request_stop)
+            except NotImplementedError:
+                pass
+        
+        latency = await self.db.get_setting('send_latency', '')
+        if latency:
+            self.simulator.record_latency(float(latency))
+        
+        pending_refresh = await self.db.get_setting('refresh_pending', '')
+        if pending_refresh:
+            self.refresher.pending.update(json.loads(pending_refresh))
+            await self.db.set_setting('refresh_pending', '')
+        
+        await self.subscription.start()
+        self.background_tasks.append(asyncio.create_task(self.refresher.prerender_queue()))
+        self.background_tasks.append(asyncio.create_task(self.resume_sends(application)))
+        self.background_tasks.append(asyncio.create_task(self.sweeper.run(application.bot)))
+        self.background_tasks.append(asyncio.create_task(self.auto_send_loop(application)))
+        self.background_tasks.append(asyncio.create_task(self.refresher.run(application.bot)))
+        self.background_tasks.append(asyncio.create_task(self.members.run(application.bot)))
+        self.background_tasks.append(asyncio.create_task(self.retention.run()))
+        self.background_tasks.append(asyncio.create_task(self.backups.run(application.bot)))
+        
+        logger.info(f"Bot ready {time.time() - LAUNCHED_AT:.2f}s after launch")
+        if self.lifecycle.restarted_at:
+            logger.info(f"Bot ready {time.time() - self.lifecycle.restarted_at:.2f}s after restart was requested")
+    
+    async def post_stop(self, application: Application):
+        self.lifecycle.stopping.set()
+        drained = await self.lifecycle.drain()
+        
+        await self.members.flush()
+        await self.db.set_setting('refresh_pending', json.dumps(sorted(self.refresher.pending)))
+        if self.simulator.samples:
+            await self.db.set_setting('send_latency', f"{self.simulator.latency:.3f}")
+        
+        for task in self.background_tasks:
+            task.cancel()
+        await asyncio.gather(*self.background_tasks, return_exceptions=True)
+        self.background_tasks.clear()
+        await self.subscription.stop()
+        self.fingerprints.close()
+        logger.info(f"Shutdown complete ({'drained' if drained else 'timed out waiting for'} in-flight sends)")
+    
+    async def resume_sends(self, application: Application):
+        checkpoint = await self.db.get_setting('resume_send', '')
+        if not checkpoint:
+            return
+        
+        await self.db.set_setting('resume_send', '')
+        async with self.send_lock:
+            configs = [cfg for cfg in await self.db.get_configs_by_uuids(json.loads(checkpoint)) if cfg.message_id is None]
+            if configs:
+                logger.info(f"Resuming {len(configs)} sends interrupted by the last shutdown")
+                await self.send_configs_batch(ContextTypes.DEFAULT_TYPE(application), configs)
+    
+    async def checkpoint_sends(self, configs: List[ConfigRecord]):
+        checkpoint = await self.db.get_setting('resume_send', '')
+        uuids = set(json.loads(checkpoint)) if checkpoint else set()
+        uuids.update(cfg.uuid for cfg in configs if cfg.id is not None)
+        await self.db.set_setting('resume_send', json.dumps(sorted(uuids)))
+        logger.info(f"Checkpointed {len(configs)} unsent configs for the next start")
     
     def run(self):
-        self.application = Application.builder().token(self.config.BOT_TOKEN).build()
+        self.application = (
+            Application.builder()
+            .application_class(ContextApplication)
+            .token(self.config.BOT_TOKEN)
+            .post_init(self.post_init)
+            .post_stop(self.post_stop)
+            .build()
+        )
         
         self.application.bot_data['db'] = self.db
         self.application.bot_data['config'] = self.config
@@ -71,13 +207,27 @@ class NonecoreBot:
         self.application.add_handler(CommandHandler('start', self.start))
         self.application.add_handler(CommandHandler('help', self.help_command))
         self.application.add_handler(CommandHandler('stats', self.stats_command))
+        self.application.add_handler(CommandHandler('report', self.report_command))
+        self.application.add_handler(CommandHandler('growth', self.growth_command))
+        self.application.add_handler(CommandHandler('backup', self.backup_command))
+        self.application.add_handler(CommandHandler('profile', self.profile_command, block=False))
+        self.application.add_handler(CommandHandler('simulate', self.simulate_command))
+        self.application.add_handler(TypeHandler(Update, self.track_update), group=-1)
+        self.application.add_handler(ChatMemberHandler(self.members.handle_update, ChatMemberHandler.CHAT_MEMBER))
         self.application.add_handler(conv_handler)
         
-        self.application.add_handler(MessageHandler(filters.Document.FileExtension("html"), self.handle_html))
+        self.application.add_handler(MessageHandler(
+            filters.Document.FileExtension("html") | filters.Document.FileExtension("zip") |
+            filters.Document.FileExtension("json"),
+            self.handle_upload
+        ))
         
         self.application.add_handler(CallbackQueryHandler(self.button_handler))
         
-        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        self.application.run_polling(allowed_updates=Update.ALL_TYPES, stop_signals=None)
+        
+        if self.lifecycle.restart_requested:
+            self.lifecycle.reexec()
     
     def is_admin(self, user_id: int) -> bool:
         return user_id == self.config.ADMIN_ID
@@ -102,8 +252,11 @@ class NonecoreBot:
         help_text = """
 📖 راهنمای ربات:
 
-📤 آپلود HTML - آپلود فایل HTML اکسپورت شده از کانال
-📊 آمار - مشاهده آمار کامل کانال و کانفیگ‌ها
+📤 آپلود HTML - آپلود فایل HTML، ZIP یا result.json اکسپورت شده از کانال
+📊 آمار - مشاهده آمار کامل کانال و کانفیگ‌ها (/report 30 برای گزارش بازه‌ای)
+💾 /backup - دریافت بکاپ آنلاین دیتابیس بدون توقف ربات
+🔬 /profile 30 - پروفایل زنده CPU و حافظه ربات (/profile 30 cpu بدون ردیابی حافظه)
+🧪 /simulate - پیش‌بینی زمان اتمام صف (مثال: /simulate batch_size=10 daily_limit=300 auto=on)
 📤 ارسال دستی - ارسال سریع یا دستی کانفیگ‌های در صف
 📱 کلاینت‌ها - دریافت لینک کلاینت‌های پیشنهادی
 ⚙️ تنظیمات - تغییر تنظیمات ربات
@@ -125,222 +278,406 @@ class NonecoreBot:
         
         stats = await self.db.get_admin_stats()
         text = self.sender.format_admin_stats(stats)
-        await update.message.reply_text(text, reply_markup=self.keyboard.back_button())
+        await update.message.reply_text(text, reply_markup=self.keyboard.stats_menu())
+    
+    async def report_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.is_admin(update.effective_user.id):
+            return
+        
+        try:
+            days = int(context.args[0]) if context.args else 7
+        except ValueError:
+            await update.message.reply_text("❌ تعداد روز را به عدد وارد کنید. مثال: /report 30")
+            return
+        
+        report = await self.db.get_report(max(1, min(days, 365)))
+        await update.message.reply_text(self.sender.format_report(report), reply_markup=self.keyboard.stats_menu())
     
-    async def handle_html(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def growth_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.is_admin(update.effective_user.id):
+            return
+        
+        try:
+            days = int(context.args[0]) if context.args else 7
+        except ValueError:
+            await update.message.reply_text("❌ تعداد روز را به عدد وارد کنید. مثال: /growth 7")
+            return
+        
+        report = await self.members.growth_report(max(1, min(days, self.config.STATS_HOURLY_DAYS)))
+        await update.message.reply_text(self.sender.format_growth_report(report), reply_markup=self.keyboard.stats_menu())
+    
+    async def backup_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.is_admin(update.effective_user.id):
+            return
+        
+        if self.backups.running:
+            await update.message.reply_text("⏳ یک بکاپ در حال انجام است، لطفاً صبر کنید.")
+            return
+        
+        status = await update.message.reply_text("⏳ در حال تهیه بکاپ از دیتابیس...")
+        try:
+            await self.backups.send(context.bot, update.effective_chat.id)
+            await status.delete()
+        except Exception as e:
+            logger.error(f"Backup failed: {e}")
+            await status.edit_text(f"❌ خطا در تهیه بکاپ: {str(e)}")
+    
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.is_admin(update.effective_user.id):
+            return
+        
+        args = list(context.args or [])
+        memory = 'cpu' not in args
+        args = [arg for arg in args if arg != 'cpu']
+        try:
+            seconds = int(args[0]) if args else 10
+        except ValueError:
+            await update.message.reply_text("❌ مدت را به ثانیه وارد کنید. مثال: /profile 30 یا /profile 30 cpu")
+            return
+        
+        if self.profiler.running:
+            await update.message.reply_text("⏳ پروفایلر در حال اجراست، لطفاً صبر کنید.")
+            return
+        
+        seconds = max(1, min(seconds, self.config.PROFILE_MAX_SECONDS))
+        status = await update.message.reply_text(f"🔬 در حال پروفایل به مدت {seconds} ثانیه...")
+        profile = await self.profiler.profile(seconds, memory)
+        await status.edit_text(self.sender.format_profile(profile)[:MAX_MESSAGE_LENGTH])
+    
+    async def simulate_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.is_admin(update.effective_user.id):
+            return
+        
+        settings = await self.simulation_settings()
+        queue_count = None
+        try:
+            for arg in context.args or []:
+                key, _, value = arg.partition('=')
+                if key == 'auto':
+                    settings.auto_send = value in ('on', 'true', '1')
+                elif key == 'queue':
+                    queue_count = max(0, int(value))
+                elif key in ('batch_size', 'interval', 'delay', 'daily_limit', 'digest_size'):
+                    setattr(settings, key, max(0, int(value)))
+                else:
+                    raise ValueError(key)
+        except ValueError:
+            await update.message.reply_text(
+                "❌ پارامتر نامعتبر. مثال:\n"
+                "/simulate queue=5000 batch_size=10 interval=60 delay=2 daily_limit=300 digest_size=5 auto=on"
+            )
+            return
+        
+        started = time.perf_counter()
+        forecast = await self.forecast_queue(settings, queue_count)
+        elapsed = time.perf_counter() - started
+        await update.message.reply_text(self.sender.format_forecast(forecast, settings, elapsed))
+    
+    async def handle_upload(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self.is_admin(update.effective_user.id):
             return
         
         document = update.message.document
+        is_html = document.file_name.lower().endswith(('.html', '.htm'))
+        max_size = self.config.MAX_HTML_SIZE if is_html else self.config.MAX_UPLOAD_SIZE
         
-        if document.file_size > self.config.MAX_HTML_SIZE:
-            await update.message.reply_text("❌ فایل بیش از حد بزرگ است. حداکثر 10 مگابایت.")
+        if document.file_size > max_size:
+            await update.message.reply_text(
+                f"❌ فایل بیش از حد بزرگ است. حداکثر {max_size // (1024 * 1024)} مگابایت."
+            )
             return
         
         processing_msg = await update.message.reply_text("⏳ در حال پردازش فایل...")
         
         try:
             file = await document.get_file()
-            file_path = f"/tmp/{document.file_name}"
-            await file.download_to_drive(file_path)
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
+            buffer = BytesIO()
+            await file.download_to_memory(out=buffer)
+            buffer.seek(0)
             
-            configs = self.processor.extract_from_html(html_content)
+            stats = await self.ingestor.ingest(buffer, document.file_name)
             
-            os.remove(file_path)
-            
-            if not configs:
-                await processing_msg.edit_text("❌ هیچ کانفیگی یافت نشد.")
+            if not stats['found']:
+                await processing_msg.edit_text(
+                    f"❌ هیچ کانفیگ جدیدی یافت نشد. ({stats['skipped']} پیام قبلاً پردازش شده بود)"
+                )
                 return
             
+            queue_count = await self.db.get_queue_count()
             daily_limit = int(await self.db.get_setting('daily_limit', self.config.DAILY_LIMIT))
             daily_sent = await self.db.get_daily_sent_count()
-            remaining_today = max(0, daily_limit - daily_sent)
+            remaining_today = daily_room(daily_limit, daily_sent)
             
-            if len(configs) > remaining_today:
-                queued = configs[remaining_today:]
-                configs = configs[:remaining_today]
-                await self.db.add_to_queue(queued)
+            if queue_count > remaining_today:
                 await update.message.reply_text(
                     f"⚠️ محدودیت امروز ({daily_limit}) رسید. "
-                    f"{len(queued)} کانفیگ به فردا موکول شد."
+                    f"{queue_count - remaining_today} کانفیگ به روزهای بعد موکول شد."
                 )
             
-            for cfg in configs:
-                cfg['message_id'] = None
-                cfg['channel_id'] = None
-                cfg['sent_at'] = None
-                await self.db.add_config(cfg)
-            
             await processing_msg.edit_text(
-                f"✅ {len(configs)} کانفیگ استخراج و به صف اضافه شد.\n"
-                f"📋 {await self.db.get_queue_count()} کانفیگ در صف\n"
+                f"✅ {stats['added']} کانفیگ جدید از {stats['messages']} پیام استخراج و به صف اضافه شد.\n"
+                f"⏭️ {stats['skipped']} پیام قبلاً پردازش شده بود.\n"
+                f"♻️ {stats['found'] - stats['known'] - stats['added']} کانفیگ تکراری نادیده گرفته شد.\n"
+                f"🗂 {stats['known']} کانفیگ قبلاً در کانال منتشر یا حذف شده بود.\n"
+                f"📋 {queue_count} کانفیگ در صف\n"
                 f"⚡ برای ارسال از دکمه 'ارسال دستی' استفاده کنید."
             )
             
         except Exception as e:
-            logger.error(f"Error processing HTML: {e}")
+            logger.error(f"Error processing upload: {e}")
             await processing_msg.edit_text(f"❌ خطا در پردازش: {str(e)}")
     
+    def build_router(self) -> CallbackRouter:
+        router = CallbackRouter()
+        routes = {
+            'main_menu': self.on_main_menu,
+            'upload_html': self.on_upload_html,
+            'stats': self.on_stats,
+            'growth': self.on_growth,
+            'rollup': self.on_rollup,
+            'manual_send': self.on_manual_send,
+            'quick_send': self.quick_send,
+            'custom_send': self.on_custom_send,
+            'clients': self.on_clients,
+            'settings': self.on_settings,
+            'reminder': self.on_toggle_reminder,
+            'restart': self.on_restart,
+            'stop_sending': self.on_stop_sending,
+            'help': self.on_help,
+            'toggle_clients': self.on_toggle_clients,
+            'toggle_reminder': self.on_toggle_reminder,
+            'toggle_auto_send': self.on_toggle_auto_send,
+            'cycle_digest': self.on_cycle_digest,
+            'toggle_digest_format': self.on_toggle_digest_format,
+            'manage_channels': self.on_manage_channels,
+            'copy': self.on_copy,
+            'report': self.on_report,
+            'confirm_report': self.on_confirm_report,
+            'cancel_report': self.on_cancel_report
+        }
+        for action, handler in routes.items():
+            router.register(action, handler)
+        return router
+    
+    async def track_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if self.lifecycle.launched_at:
+            self.lifecycle.record_update()
+    
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
+        await self.router.dispatch(query.data, update, context)
+    
+    async def resolve_config(self, ref) -> Optional[ConfigRecord]:
+        if isinstance(ref, int):
+            return await self.db.get_config_by_id(ref)
+        return await self.db.get_config_by_uuid(ref)
+    
+    async def on_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await update.callback_query.edit_message_text(
+            "از منوی زیر انتخاب کنید:",
+            reply_markup=self.keyboard.main_menu()
+        )
+    
+    async def on_upload_html(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await update.callback_query.edit_message_text(
+            "📤 لطفاً فایل HTML، ZIP صفحات اکسپورت یا result.json را ارسال کنید.\n\n"
+            "⚠️ فایل باید از کانال تلگرام اکسپورت شده باشد.",
+            reply_markup=self.keyboard.back_button()
+        )
+    
+    async def on_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        stats = await self.db.get_admin_stats()
+        text = self.sender.format_admin_stats(stats)
+        await update.callback_query.edit_message_text(text, reply_markup=self.keyboard.stats_menu())
+    
+    async def on_growth(self, update: Update, context: ContextTypes.DEFAULT_TYPE, days: int = 7):
+        report = await self.members.growth_report(days)
+        await update.callback_query.edit_message_text(
+            self.sender.format_growth_report(report), reply_markup=self.keyboard.stats_menu()
+        )
+    
+    async def on_rollup(self, update: Update, context: ContextTypes.DEFAULT_TYPE, days: int = 7):
+        report = await self.db.get_report(days)
+        await update.callback_query.edit_message_text(
+            self.sender.format_report(report), reply_markup=self.keyboard.stats_menu()
+        )
+    
+    async def on_manual_send(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        forecast = await self.forecast_queue()
+        status_text = self.sender.format_queue_status(forecast)
+        await update.callback_query.edit_message_text(
+            f"{status_text}\n\nروش ارسال را انتخاب کنید:",
+            reply_markup=self.keyboard.manual_send_menu()
+        )
+    
+    async def simulation_settings(self) -> SimulationSettings:
+        return SimulationSettings(
+            batch_size=int(await self.db.get_setting('batch_size', self.config.BATCH_SIZE)),
+            interval=int(await self.db.get_setting('interval', self.config.BATCH_INTERVAL)),
+            delay=int(await self.db.get_setting('delay', self.config.DELAY)),
+            daily_limit=int(await self.db.get_setting('daily_limit', self.config.DAILY_LIMIT)),
+            digest_size=int(await self.db.get_setting('digest_size', '0')),
+            auto_send=await self.db.get_setting('auto_send', 'false') == 'true'
+        )
+    
+    async def forecast_queue(self, settings: Optional[SimulationSettings] = None,
+                             queue_count: Optional[int] = None) -> Dict:
+        settings = settings or await self.simulation_settings()
+        if queue_count is None:
+            queue_count = await self.db.get_queue_count()
+        return self.simulator.simulate(queue_count, settings, utc_now(), await self.db.get_daily_sent_count())
+    
+    async def on_custom_send(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        return  # Handled by ConversationHandler
+    
+    async def on_clients(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await update.callback_query.edit_message_text(
+            "📱 کلاینت‌های پیشنهادی:",
+            reply_markup=self.keyboard.clients_menu(self.config.SUBSCRIPTION_URL)
+        )
+    
+    async def on_settings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        db = self.db
+        settings = {
+            'interval': await db.get_setting('interval', '120'),
+            'batch_size': await db.get_setting('batch_size', '5'),
+            'delay': await db.get_setting('delay', '0'),
+            'send_clients': await db.get_setting('send_clients', 'true'),
+            'reminder_enabled': await db.get_setting('reminder_enabled', 'true'),
+            'auto_send': await db.get_setting('auto_send', 'false'),
+            'digest_size': await db.get_setting('digest_size', '0'),
+            'digest_format': await db.get_setting('digest_format', 'list'),
+            'daily_limit': await db.get_setting('daily_limit', '200')
+        }
+        text = self.sender.format_settings(settings)
+        await update.callback_query.edit_message_text(text, reply_markup=self.keyboard.settings_menu())
+    
+    async def toggle_setting(self, key: str, default: str) -> str:
+        current = await self.db.get_setting(key, default)
+        new_val = 'false' if current == 'true' else 'true'
+        await self.db.set_setting(key, new_val)
+        return '✅ فعال' if new_val == 'true' else '❌ غیرفعال'
+    
+    async def on_toggle_reminder(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        status = await self.toggle_setting('reminder_enabled', 'true')
+        await update.callback_query.edit_message_text(
+            f"🔔 یادآوری renewal {status} شد.",
+            reply_markup=self.keyboard.back_button()
+        )
+    
+    async def on_restart(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await update.callback_query.edit_message_text("🔄 در حال راه‌اندازی مجدد...")
+        await self.notify_admin(context, "🔄 ربات توسط ادمین ری‌استارت شد. ارسال‌های نیمه‌کاره پس از راه‌اندازی ادامه می‌یابند.")
+        self.lifecycle.request_stop(restart=True)
+    
+    async def on_stop_sending(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        db = self.db
+        current = await db.get_setting('stop_sending', 'false')
+        new_val = 'true' if current == 'false' else 'false'
+        await db.set_setting('stop_sending', new_val)
         
-        data = query.data
-        db = context.bot_data['db']
-        
-        if data == 'main_menu':
-            await query.edit_message_text(
-                "از منوی زیر انتخاب کنید:",
-                reply_markup=self.keyboard.main_menu()
-            )
-        
-        elif data == 'upload_html':
-            await query.edit_message_text(
-                "📤 لطفاً فایل HTML را ارسال کنید.\n\n"
-                "⚠️ فایل باید از کانال تلگرام اکسپورت شده باشد.",
-                reply_markup=self.keyboard.back_button()
-            )
-        
-        elif data == 'stats':
-            stats = await db.get_admin_stats()
-            text = self.sender.format_admin_stats(stats)
-            await query.edit_message_text(text, reply_markup=self.keyboard.back_button())
-        
-        elif data == 'manual_send':
-            queue_count = await db.get_queue_count()
-            settings = {
-                'batch_size': await db.get_setting('batch_size', '5'),
-                'interval': await db.get_setting('interval', '120'),
-                'delay': await db.get_setting('delay', '0')
-            }
-            status_text = self.sender.format_queue_status(queue_count, int(settings['batch_size']), 
-                                                          int(settings['interval']), int(settings['delay']))
-            await query.edit_message_text(
-                f"{status_text}\n\nروش ارسال را انتخاب کنید:",
-                reply_markup=self.keyboard.manual_send_menu()
-            )
-        
-        elif data == 'quick_send_10':
-            await self.quick_send(update, context, 10)
-        
-        elif data == 'custom_send':
-            return  # Handled by ConversationHandler
-        
-        elif data == 'clients':
-            await query.edit_message_text(
-                "📱 کلاینت‌های پیشنهادی:",
-                reply_markup=self.keyboard.clients_menu()
-            )
-        
-        elif data == 'settings':
-            settings = {
-                'interval': await db.get_setting('interval', '120'),
-                'batch_size': await db.get_setting('batch_size', '5'),
-                'delay': await db.get_setting('delay', '0'),
-                'send_clients': await db.get_setting('send_clients', 'true'),
-                'reminder_enabled': await db.get_setting('reminder_enabled', 'true'),
-                'daily_limit': await db.get_setting('daily_limit', '200')
-            }
-            text = self.sender.format_settings(settings)
-            await query.edit_message_text(text, reply_markup=self.keyboard.settings_menu())
-        
-        elif data == 'reminder':
-            current = await db.get_setting('reminder_enabled', 'true')
-            new_val = 'false' if current == 'true' else 'true'
-            await db.set_setting('reminder_enabled', new_val)
-            status = '✅ فعال' if new_val == 'true' else '❌ غیرفعال'
+        if new_val == 'true':
+            queue = await db.get_queue_count()
             await query.edit_message_text(
-                f"🔔 یادآوری renewal {status} شد.",
+                f"⛔ ارسال متوقف شد. {queue} کانفیگ در صف مانده.",
                 reply_markup=self.keyboard.back_button()
             )
-        
-        elif data == 'restart':
-            await query.edit_message_text("🔄 در حال راه‌اندازی مجدد...")
-            await self.notify_admin(context, "🔄 ربات توسط ادمین ری‌استارت شد.")
-            os._exit(0)
-        
-        elif data == 'stop_sending':
-            current = await db.get_setting('stop_sending', 'false')
-            new_val = 'true' if current == 'false' else 'false'
-            await db.set_setting('stop_sending', new_val)
-            
-            if new_val == 'true':
-                queue = await db.get_queue_count()
-                await query.edit_message_text(
-                    f"⛔ ارسال متوقف شد. {queue} کانفیگ در صف مانده.",
-                    reply_markup=self.keyboard.back_button()
-                )
-            else:
-                await query.edit_message_text(
-                    "✅ ارسال از سر گرفته شد.",
-                    reply_markup=self.keyboard.back_button()
-                )
-        
-        elif data == 'help':
-            await self.show_help(query)
-        
-        elif data == 'toggle_clients':
-            current = await db.get_setting('send_clients', 'true')
-            new_val = 'false' if current == 'true' else 'true'
-            await db.set_setting('send_clients', new_val)
-            status = '✅ فعال' if new_val == 'true' else '❌ غیرفعال'
+        else:
             await query.edit_message_text(
-                f"📱 ارسال کلاینت‌ها {status} شد.",
+                "✅ ارسال از سر گرفته شد.",
                 reply_markup=self.keyboard.back_button()
             )
-        
-        elif data == 'toggle_reminder':
-            current = await db.get_setting('reminder_enabled', 'true')
-            new_val = 'false' if current == 'true' else 'true'
-            await db.set_setting('reminder_enabled', new_val)
-            status = '✅ فعال' if new_val == 'true' else '❌ غیرفعال'
-            await query.edit_message_text(
-                f"🔔 یادآوری renewal {status} شد.",
-                reply_markup=self.keyboard.back_button()
+    
+    async def on_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await self.show_help(update.callback_query)
+    
+    async def on_toggle_clients(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        status = await self.toggle_setting('send_clients', 'true')
+        await update.callback_query.edit_message_text(
+            f"📱 ارسال کلاینت‌ها {status} شد.",
+            reply_markup=self.keyboard.back_button()
+        )
+    
+    async def on_toggle_auto_send(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        status = await self.toggle_setting('auto_send', 'false')
+        await update.callback_query.edit_message_text(
+            f"🗓️ ارسال خودکار طبق تقویم {status} شد.",
+            reply_markup=self.keyboard.back_button()
+        )
+    
+    async def on_cycle_digest(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        current = int(await self.db.get_setting('digest_size', '0'))
+        sizes = DIGEST_SIZES
+        new_size = sizes[(sizes.index(current) + 1) % len(sizes)] if current in sizes else sizes[0]
+        await self.db.set_setting('digest_size', str(new_size))
+        status = f"{new_size} کانفیگ در هر پیام" if new_size > 1 else '❌ غیرفعال'
+        batch_size = int(await self.db.get_setting('batch_size', self.config.BATCH_SIZE))
+        width = batch_width(batch_size, new_size)
+        if width != batch_size:
+            status += f"\nℹ️ هر batch برای دایجست کامل به {width} کانفیگ گرد می‌شود (batch فعلی: {batch_size})."
+        await update.callback_query.edit_message_text(
+            f"🗂️ حالت دایجست: {status}",
+            reply_markup=self.keyboard.back_button()
+        )
+    
+    async def on_toggle_digest_format(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        current = await self.db.get_setting('digest_format', 'list')
+        new_val = 'file' if current == 'list' else 'list'
+        await self.db.set_setting('digest_format', new_val)
+        await update.callback_query.edit_message_text(
+            f"📄 فرمت دایجست: {'فایل .txt' if new_val == 'file' else 'لیست متنی'}",
+            reply_markup=self.keyboard.back_button()
+        )
+    
+    async def on_manage_channels(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        channels = await self.db.get_channels()
+        text = "📢 کانال‌های فعال:\n" + "\n".join([f"• {ch}" for ch in channels])
+        await update.callback_query.edit_message_text(text, reply_markup=self.keyboard.back_button())
+    
+    async def on_copy(self, update: Update, context: ContextTypes.DEFAULT_TYPE, ref):
+        cfg = await self.resolve_config(ref)
+        if cfg:
+            await self.db.increment_copy_count(cfg.uuid)
+        await update.callback_query.answer("✅ کپی شد!", show_alert=False)
+    
+    async def buttons_for(self, cfg: ConfigRecord) -> InlineKeyboardMarkup:
+        if cfg.render_hash == DIGEST_RENDER and cfg.channel_id and cfg.message_id:
+            siblings = await self.db.get_configs_on_message(cfg.channel_id, cfg.message_id)
+            return self.keyboard.digest_buttons([sibling.id for sibling in siblings])
+        return self.keyboard.config_buttons(cfg.id)
+    
+    async def on_report(self, update: Update, context: ContextTypes.DEFAULT_TYPE, ref):
+        cfg = await self.resolve_config(ref)
+        if cfg:
+            await update.callback_query.edit_message_reply_markup(
+                reply_markup=self.keyboard.confirm_report(cfg.id)
             )
+    
+    async def on_confirm_report(self, update: Update, context: ContextTypes.DEFAULT_TYPE, ref):
+        query = update.callback_query
+        cfg = await self.resolve_config(ref)
+        if not cfg:
+            return
         
-        elif data == 'manage_channels':
-            channels = await db.get_channels()
-            text = "📢 کانال‌های فعال:\n" + "\n".join([f"• {ch}" for ch in channels])
-            await query.edit_message_text(text, reply_markup=self.keyboard.back_button())
-        
-        elif data.startswith('copy_'):
-            uuid = data.replace('copy_', '')
-            await db.increment_copy_count(uuid)
-            await query.answer("✅ کپی شد!", show_alert=False)
-        
-        elif data.startswith('report_'):
-            uuid = data.replace('report_', '')
-            await query.edit_message_reply_markup(
-                reply_markup=self.keyboard.confirm_report(uuid)
-            )
+        new_count = await self.db.increment_bad_report(cfg.uuid)
+        await query.answer(f"✅ گزارش ثبت شد ({new_count}/5)", show_alert=True)
         
-        elif data.startswith('confirm_report_'):
-            uuid = data.replace('confirm_report_', '')
-            new_count = await db.increment_bad_report(uuid)
-            await query.answer("✅ گزارش ثبت شد", show_alert=True)
-            
-            if await db.should_delete_config(uuid):
-                await self.delete_config(context, uuid)
+        if await self.db.should_delete_config(cfg.uuid):
+            await self.delete_config(context, cfg.uuid)
+            if cfg.render_hash != DIGEST_RENDER:
                 await query.edit_message_text("❌ کانفیگ به دلیل گزارش‌های متعدد حذف شد.")
-            else:
-                await query.edit_message_text(
-                    f"⚠️ گزارش خرابی ثبت شد. ({new_count}/5)",
-                    reply_markup=self.keyboard.back_button()
-                )
-        
-        elif data.startswith('cancel_report_'):
-            uuid = data.replace('cancel_report_', '')
-            cfg = await db.get_config_by_uuid(uuid)
-            if cfg:
-                await query.edit_message_reply_markup(
-                    reply_markup=self.keyboard.config_buttons(uuid)
-                )
+        else:
+            await query.edit_message_reply_markup(reply_markup=await self.buttons_for(cfg))
+            self.refresher.mark(cfg.uuid)
     
-    async def quick_send(self, update: Update, context: ContextTypes.DEFAULT_TYPE, count: int):
+    async def on_cancel_report(self, update: Update, context: ContextTypes.DEFAULT_TYPE, ref):
+        cfg = await self.resolve_config(ref)
+        if cfg:
+            await update.callback_query.edit_message_reply_markup(reply_markup=await self.buttons_for(cfg))
+    
+    async def quick_send(self, update: Update, context: ContextTypes.DEFAULT_TYPE, count: int = 10):
         query = update.callback_query
         db = context.bot_data['db']
         
@@ -352,17 +689,18 @@ class NonecoreBot:
             )
             return
         
-        configs = await db.get_pending_configs(limit=count)
-        if not configs:
-            await query.edit_message_text(
-                "❌ هیچ کانفیگی در صف نیست.",
-                reply_markup=self.keyboard.back_button()
-            )
-            return
-        
-        await query.edit_message_text(f"⏳ در حال ارسال {len(configs)} کانفیگ...")
-        
-        await self.send_configs_batch(context, configs)
+        async with self.send_lock:
+            configs = await self.pick_configs(count)
+            if not configs:
+                await query.edit_message_text(
+                    "❌ هیچ کانفیگی در صف نیست.",
+                    reply_markup=self.keyboard.back_button()
+                )
+                return
+            
+            await query.edit_message_text(f"⏳ در حال ارسال {len(configs)} کانفیگ...")
+            
+            await self.send_configs_batch(context, configs)
         
         remaining = await db.get_queue_count()
         await query.edit_message_text(
@@ -371,20 +709,48 @@ class NonecoreBot:
             reply_markup=self.keyboard.back_button()
         )
     
-    async def send_configs_batch(self, context: ContextTypes.DEFAULT_TYPE, configs: List[Dict]):
+    async def pick_configs(self, count: int) -> List[ConfigRecord]:
+        queue_count = await self.db.get_queue_count()
+        pool_size = max(count, self.config.SCHEDULER_POOL_SIZE)
+        if pool_size >= queue_count:
+            # The pool is the whole queue, so a plain scan replaces sampling; the scheduler ranks every row anyway
+            pool = await self.db.get_pending_configs()
+        else:
+            pool = await self.db.get_pending_configs(limit=pool_size, mode='random')
+        server_reports = await self.db.get_server_report_counts([cfg.server for cfg in pool])
+        return self.scheduler.select(pool, count, server_reports)
+    
+    async def send_configs_batch(self, context: ContextTypes.DEFAULT_TYPE, configs: List[ConfigRecord]):
         db = context.bot_data['db']
         config = context.bot_data['config']
         
         batch_size = int(await db.get_setting('batch_size', config.BATCH_SIZE))
         interval = int(await db.get_setting('interval', config.BATCH_INTERVAL))
         delay = int(await db.get_setting('delay', config.DELAY))
+        width = batch_width(batch_size, int(await db.get_setting('digest_size', '0')))
         
-        random.shuffle(configs)
+        batches = [configs[i:i + width] for i in range(0, len(configs), width)]
         
-        batches = [configs[i:i + batch_size] for i in range(0, len(configs), batch_size)]
+        async with self.lifecycle.sending():
+            await self._send_batches(context, batches, interval, delay)
+    
+    async def _send_batches(self, context: ContextTypes.DEFAULT_TYPE, batches: List[List[ConfigRecord]],
+                            interval: int, delay: int):
+        db = context.bot_data['db']
+        config = context.bot_data['config']
+        
+        digest_size = int(await db.get_setting('digest_size', '0'))
+        digest_format = await db.get_setting('digest_format', 'list')
+        group_size = digest_size if digest_size > 1 else 1
         
         for i, batch in enumerate(batches):
-            for cfg in batch:
+            groups = [batch[k:k + group_size] for k in range(0, len(batch), group_size)]
+            for j, group in enumerate(groups):
+                if self.lifecycle.is_stopping:
+                    remaining = [cfg for rest in groups[j:] for cfg in rest]
+                    await self.checkpoint_sends(remaining + [cfg for rest in batches[i + 1:] for cfg in rest])
+                    return
+                
                 stop_sending = await db.get_setting('stop_sending', 'false')
                 if stop_sending == 'true':
                     logger.info("Sending stopped by admin")
@@ -394,37 +760,145 @@ class NonecoreBot:
                     daily_limit = int(await db.get_setting('daily_limit', config.DAILY_LIMIT))
                     daily_sent = await db.get_daily_sent_count()
                     
-                    if daily_sent >= daily_limit:
-                        logger.info(f"Daily limit reached: {daily_sent}/{daily_limit}")
+                    room = daily_room(daily_limit, daily_sent)
+                    if not room:
+                        logger.info("Daily limit reached: %s/%s", daily_sent, daily_limit)
                         return
+                    group = group[:room]
                     
-                    message = await self.send_single_config(context, cfg)
-                    if message:
-                        cfg['message_id'] = message.message_id
-                        cfg['channel_id'] = str(message.chat.id)
-                        cfg['sent_at'] = datetime.now().isoformat()
-                        
-                        config_id = await db.add_config(cfg)
-                        cfg['id'] = config_id
-                        
-                        await db.increment_daily_count(cfg.get('location'))
+                    for cfg in group:
+                        if cfg.id is None:
+                            cfg.id = await db.add_config(cfg)
+                    
+                    started = time.perf_counter()
+                    if group_size > 1:
+                        with log_context(config_uuids=[cfg.uuid for cfg in group]):
+                            sent = await self.send_digest(context, group, digest_format)
+                    else:
+                        with log_context(config_uuid=group[0].uuid):
+                            sent = await self.send_one(context, group[0])
+                    
+                    if sent:
+                        self.simulator.record_latency(time.perf_counter() - started)
+                        elapsed = self.lifecycle.record_send()
+                        if elapsed is not None:
+                            await self.notify_admin(context, f"⏱️ اولین کانفیگ {elapsed:.1f} ثانیه پس از ری‌استارت ارسال شد.")
                         
                         if delay > 0:
-                            await asyncio.sleep(delay)
+                            await self.lifecycle.sleep(delay)
                             
                 except Exception as e:
-                    logger.error(f"Error sending config {cfg.get('uuid')}: {e}")
+                    logger.error("Error sending configs %s: %s", [cfg.uuid for cfg in group], e)
                     continue
             
             if i < len(batches) - 1:
-                await asyncio.sleep(interval)
+                await self.lifecycle.sleep(interval)
+    
+    async def send_one(self, context: ContextTypes.DEFAULT_TYPE, cfg: ConfigRecord) -> bool:
+        db = context.bot_data['db']
+        
+        cfg.sent_at = utc_now().isoformat(timespec='seconds')
+        text, markup, render_hash = self.refresher.prepared(cfg)
+        message = await self.send_single_config(context, cfg, text, markup)
+        if not message:
+            cfg.sent_at = None
+            return False
+        
+        cfg.message_id = message.message_id
+        cfg.channel_id = str(message.chat.id)
+        cfg.render_hash = render_hash
+        cfg.rendered_text = None
+        cfg.rendered_markup = None
+        
+        await db.add_config(cfg)
+        await db.increment_daily_count(cfg.location)
+        return True
     
-    async def send_single_config(self, context: ContextTypes.DEFAULT_TYPE, cfg: Dict) -> Any:
+    async def send_digest(self, context: ContextTypes.DEFAULT_TYPE, configs: List[ConfigRecord],
+                          digest_format: str = 'list') -> bool:
+        db = context.bot_data['db']
+        channel_id = self.config.CHANNELS[0] if self.config.CHANNELS else None
+        if not channel_id:
+            logger.error("No channel configured")
+            return False
+        
+        sent_at = utc_now().isoformat(timespec='seconds')
+        for cfg in configs:
+            cfg.sent_at = sent_at
+        
+        markup = self.keyboard.digest_buttons([cfg.id for cfg in configs])
+        text = self.sender.format_digest_text(configs)
+        try:
+            if digest_format == 'file' or len(text) > MAX_MESSAGE_LENGTH:
+                document, caption = self.sender.build_digest_file(configs)
+                message = await context.bot.send_document(
+                    chat_id=channel_id,
+                    document=document,
+                    caption=caption,
+                    parse_mode='HTML',
+                    reply_markup=markup
+                )
+            else:
+                message = await context.bot.send_message(
+                    chat_id=channel_id,
+                    text=text,
+                    parse_mode='HTML',
+                    reply_markup=markup
+                )
+        except Exception as e:
+            logger.error("Failed to send digest to channel %s: %s", channel_id, e)
+            for cfg in configs:
+                cfg.sent_at = None
+            return False
+        
+        for cfg in configs:
+            cfg.message_id = message.message_id
+            cfg.channel_id = str(message.chat.id)
+            cfg.render_hash = DIGEST_RENDER
+        
+        await db.record_digest_sent(configs)
+        return True
+    
+    async def auto_send_loop(self, application: Application):
+        context = ContextTypes.DEFAULT_TYPE(application)
+        while not self.lifecycle.is_stopping:
+            try:
+                await self.auto_send_tick(context)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Auto send failed: {e}")
+            
+            interval = int(await self.db.get_setting('interval', self.config.BATCH_INTERVAL))
+            await self.lifecycle.sleep(max(interval, 10))
+    
+    async def auto_send_tick(self, context: ContextTypes.DEFAULT_TYPE):
+        if await self.db.get_setting('auto_send', 'false') != 'true':
+            return
+        if await self.db.get_setting('stop_sending', 'false') == 'true':
+            return
+        
+        async with self.send_lock:
+            daily_limit = int(await self.db.get_setting('daily_limit', self.config.DAILY_LIMIT))
+            self.calendar.build(daily_limit)
+            allowance = self.calendar.allowance(self.calendar.now(), await self.db.get_daily_sent_count())
+            
+            batch_size = int(await self.db.get_setting('batch_size', self.config.BATCH_SIZE))
+            count = min(allowance, batch_width(batch_size, int(await self.db.get_setting('digest_size', '0'))))
+            if count <= 0:
+                return
+            
+            configs = await self.pick_configs(count)
+            if configs:
+                await self.send_configs_batch(context, configs)
+    
+    async def send_single_config(self, context: ContextTypes.DEFAULT_TYPE, cfg: ConfigRecord,
+                                 text: Optional[str] = None, markup: Optional[Union[InlineKeyboardMarkup, str]] = None) -> Any:
         sender = context.bot_data['sender']
         keyboard = context.bot_data['keyboard']
         config = context.bot_data['config']
         
-        text = sender.format_config_text(cfg)
+        text = text or sender.config_text(cfg)
         channel_id = config.CHANNELS[0] if config.CHANNELS else None
         
         if not channel_id:
@@ -436,26 +910,30 @@ class NonecoreBot:
                 chat_id=channel_id,
                 text=text,
                 parse_mode='HTML',
-                reply_markup=keyboard.config_buttons(cfg['uuid'])
+                reply_markup=markup or keyboard.config_buttons(cfg.id)
             )
         except Exception as e:
-            logger.error(f"Failed to send to channel {channel_id}: {e}")
+            logger.error("Failed to send to channel %s: %s", channel_id, e)
             return None
     
     async def delete_config(self, context: ContextTypes.DEFAULT_TYPE, uuid: str):
         db = context.bot_data['db']
         config = await db.get_config_by_uuid(uuid)
+        posted = bool(config and config.message_id and config.channel_id)
+        shared = posted and bool(await db.get_shared_messages([uuid]))
         
-        if config and config.get('message_id') and config.get('channel_id'):
+        if posted and not shared:
             try:
                 await context.bot.delete_message(
-                    chat_id=config['channel_id'],
-                    message_id=config['message_id']
+                    chat_id=config.channel_id,
+                    message_id=config.message_id
                 )
             except Exception as e:
                 logger.error(f"Failed to delete message: {e}")
         
         await db.delete_config(uuid)
+        if shared:
+            await self.refresher.refresh_digest(context.bot, config.channel_id, config.message_id)
     
     async def notify_admin(self, context: ContextTypes.DEFAULT_TYPE, text: str):
         try:
@@ -584,11 +1062,12 @@ class NonecoreBot:
                 await update.message.reply_text(f"❌ فقط {queue} کانفیگ در صف است.")
                 return CUSTOM_SEND
             
-            configs = await self.db.get_pending_configs(limit=count)
-            
-            processing_msg = await update.message.reply_text(f"⏳ در حال ارسال {len(configs)} کانفیگ...")
-            
-            await self.send_configs_batch(context, configs)
+            async with self.send_lock:
+                configs = await self.pick_configs(count)
+                
+                processing_msg = await update.message.reply_text(f"⏳ در حال ارسال {len(configs)} کانفیگ...")
+                
+                await self.send_configs_batch(context, configs)
             
             remaining = await self.db.get_queue_count()
             await processing_msg.edit_text(
@@ -611,8 +1090,11 @@ class NonecoreBot:
         help_text = """
 📖 راهنمای ربات:
 
-📤 آپلود HTML - آپلود فایل HTML اکسپورت شده از کانال
-📊 آمار - مشاهده آمار کامل کانال و کانفیگ‌ها
+📤 آپلود HTML - آپلود فایل HTML، ZIP یا result.json اکسپورت شده از کانال
+📊 آمار - مشاهده آمار کامل کانال و کانفیگ‌ها (/report 30 برای گزارش بازه‌ای)
+💾 /backup - دریافت بکاپ آنلاین دیتابیس بدون توقف ربات
+🔬 /profile 30 - پروفایل زنده CPU و حافظه ربات (/profile 30 cpu بدون ردیابی حافظه)
+🧪 /simulate - پیش‌بینی زمان اتمام صف (مثال: /simulate batch_size=10 daily_limit=300 auto=on)
 📤 ارسال دستی - ارسال سریع یا دستی کانفیگ‌های در صف
 📱 کلاینت‌ها - دریافت لینک کلاینت‌های پیشنهادی
 ⚙️ تنظیمات - تغییر تنظیمات ربات
@@ -628,10 +1110,10 @@ class NonecoreBot:
         """
         await query.edit_message_text(help_text, reply_markup=self.keyboard.back_button())
 
-async def main():
+def main():
+    setup_logging(Config)
     bot = NonecoreBot()
-    await bot.init()
     bot.run()
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    main()
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from telegram import ChatMember, ChatMemberUpdated, Update
+from telegram.ext import ContextTypes
+
+from send_calendar import utc_now
+
+logger = logging.getLogger(__name__)
+
+MEMBER_STATUSES = {ChatMember.MEMBER, ChatMember.ADMINISTRATOR, ChatMember.OWNER}
+
+def _is_member(member: ChatMember) -> bool:
+    if member.status == ChatMember.RESTRICTED:
+        return bool(getattr(member, 'is_member', False))
+    return member.status in MEMBER_STATUSES
+
+def membership_change(update: ChatMemberUpdated) -> Optional[int]:
+    was_member = _is_member(update.old_chat_member)
+    is_member = _is_member(update.new_chat_member)
+    if was_member == is_member:
+        return None
+    return 1 if is_member else -1
+
+def _bucket() -> str:
+    return utc_now().strftime('%Y-%m-%dT%H')
+
+class MemberTracker:
+    def __init__(self, db, config):
+        self.db = db
+        self.config = config
+        self.tz = ZoneInfo(config.TIMEZONE)
+        self.joins: Counter = Counter()
+        self.leaves: Counter = Counter()
+        self.chat_ids: Dict[str, str] = {}
+    
+    def is_tracked(self, chat) -> bool:
+        names = {str(chat.id)}
+        if chat.username:
+            names.add(f"@{chat.username}")
+        return any(channel in names for channel in self.config.CHANNELS)
+    
+    async def handle_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        member_update = update.chat_member
+        if not member_update or not self.is_tracked(member_update.chat):
+            return
+        
+        change = membership_change(member_update)
+        if change is None:
+            return
+        
+        key = (_bucket(), str(member_update.chat.id))
+        if change > 0:
+            self.joins[key] += 1
+        else:
+            self.leaves[key] += 1
+    
+    async def run(self, bot):
+        polled_at = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.config.MEMBER_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+                if loop.time() - polled_at >= self.config.MEMBER_POLL_INTERVAL:
+                    await self.poll_counts(bot)
+                    polled_at = loop.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Member tracking failed: {e}")
+    
+    async def flush(self) -> int:
+        if not self.joins and not self.leaves:
+            return 0
+        
+        joins, self.joins = self.joins, Counter()
+        leaves, self.leaves = self.leaves, Counter()
+        changes: Dict[Tuple[str, str], Tuple[int, int]] = {
+            key: (joins[key], leaves[key]) for key in set(joins) | set(leaves)
+        }
+        await self.db.record_member_changes(changes)
+        return sum(joins.values()) + sum(leaves.values())
+    
+    async def poll_counts(self, bot) -> Dict[str, int]:
+        counts = {}
+        for channel in self.config.CHANNELS:
+            try:
+                if channel not in self.chat_ids:
+                    self.chat_ids[channel] = str((await bot.get_chat(channel)).id)
+                chat_id = self.chat_ids[channel]
+                counts[chat_id] = await bot.get_chat_member_count(chat_id)
+            except Exception as e:
+                logger.error(f"Failed to get member count for {channel}: {e}")
+        
+        await self.db.record_member_counts(_bucket(), counts)
+        return counts
+    
+    @staticmethod
+    def correlation(xs: List[float], ys: List[float]) -> Optional[float]:
+        n = len(xs)
+        if n < 3:
+            return None
+        mean_x = sum(xs) / n
+        mean_y = sum(ys) / n
+        cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        var_y = sum((y - mean_y) ** 2 for y in ys)
+        if not var_x or not var_y:
+            return None
+        return cov / (var_x * var_y) ** 0.5
+    
+    async def growth_report(self, days: int) -> Dict:
+        now = utc_now().replace(minute=0, second=0, microsecond=0)
+        start = now - timedelta(days=days)
+        rows = await self.db.get_hourly_growth(start.strftime('%Y-%m-%dT%H'))
+        
+        sent, net = [], []
+        by_hour = defaultdict(lambda: [0, 0, 0])
+        joins = leaves = 0
+        moment = start
+        while moment <= now:
+            bucket_joins, bucket_leaves, bucket_sent = rows.get(moment.strftime('%Y-%m-%dT%H'), (0, 0, 0))
+            joins += bucket_joins
+            leaves += bucket_leaves
+            sent.append(bucket_sent)
+            net.append(bucket_joins - bucket_leaves)
+            
+            hour = by_hour[moment.astimezone(self.tz).hour]
+            hour[0] += bucket_sent
+            hour[1] += bucket_joins - bucket_leaves
+            hour[2] += 1
+            moment += timedelta(hours=1)
+        
+        hours = {
+            hour: (total_sent / samples, total_net / samples)
+            for hour, (total_sent, total_net, samples) in by_hour.items()
+        }
+        best_hours = sorted(hours.items(), key=lambda item: item[1][1], reverse=True)[:3]
+        
+        return {
+            'days': days,
+            'joins': joins,
+            'leaves': leaves,
+            'total_members': await self.db.get_total_members(),
+            'correlation': self.correlation(sent, net),
+            'lagged_correlation': self.correlation(sent[:-1], net[1:]),
+            'best_hours': best_hours
+        }
@@ -0,0 +1,34 @@
+from dataclasses import dataclass, fields
+from typing import Optional
+
+@dataclass(slots=True)
+class ConfigRecord:
+    uuid: str
+    type: str
+    link: str
+    server: str = 'unknown'
+    port: int = 443
+    location: str = '🌍 Unknown'
+    ping: str = 'N/A'
+    quality: str = '⚪ Unknown'
+    source: str = 'NONEcore'
+    fingerprint: Optional[str] = None
+    channel_id: Optional[str] = None
+    message_id: Optional[int] = None
+    bad_reports: int = 0
+    copy_count: int = 0
+    probe_failures: int = 0
+    created_at: Optional[str] = None
+    sent_at: Optional[str] = None
+    last_probed_at: Optional[str] = None
+    render_hash: Optional[str] = None
+    rendered_text: Optional[str] = None
+    render_version: Optional[str] = None
+    rendered_markup: Optional[str] = None
+    id: Optional[int] = None
+
+CONFIG_COLUMNS = tuple(f.name for f in fields(ConfigRecord))
+CONFIG_SELECT = ', '.join(CONFIG_COLUMNS)
+
+def config_row_factory(cursor, row) -> ConfigRecord:
+    return ConfigRecord(*row)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+IDLE_FUNCTIONS = {'select', 'poll', 'epoll', '_run_once'}
+
+def _label(code) -> str:
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _task_label(task) -> str:
+    coro = task.get_coro()
+    return getattr(coro, '__qualname__', None) or task.get_name()
+
+class Profiler:
+    def __init__(self, config):
+        self.config = config
+        self.running = False
+    
+    async def profile(self, seconds: float, memory: bool = True) -> Dict:
+        if self.running:
+            raise RuntimeError("profiler is already running")
+        
+        self.running = True
+        loop = asyncio.get_running_loop()
+        counters = {
+            'samples': 0, 'loop_busy': 0,
+            'self': Counter(), 'cumulative': Counter(), 'tasks': Counter(), 'threads': Counter()
+        }
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample, args=(loop, threading.get_ident(), stop, counters),
+            name='profiler', daemon=True
+        )
+        
+        # tracemalloc hooks every allocation, so it is only switched on for the profiling window
+        owns_tracemalloc = memory and not tracemalloc.is_tracing()
+        if owns_tracemalloc:
+            tracemalloc.start(self.config.PROFILE_TRACE_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot() if memory else None
+            started = time.perf_counter()
+            sampler.start()
+            await asyncio.sleep(seconds)
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            elapsed = time.perf_counter() - started
+            after = tracemalloc.take_snapshot() if memory else None
+        finally:
+            stop.set()
+            if owns_tracemalloc:
+                tracemalloc.stop()
+            self.running = False
+        
+        allocations = []
+        if memory:
+            ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            allocations = [
+                stat for stat in after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+                if stat.size_diff > 0
+            ][:self.config.PROFILE_TOP]
+        
+        top = self.config.PROFILE_TOP
+        samples = counters['samples'] or 1
+        return {
+            'seconds': elapsed,
+            'samples': counters['samples'],
+            'loop_busy': counters['loop_busy'] / samples,
+            'self': counters['self'].most_common(top),
+            'cumulative': counters['cumulative'].most_common(top),
+            'tasks': counters['tasks'].most_common(top),
+            'threads': counters['threads'].most_common(top),
+            'memory': memory,
+            'allocations': [
+                (f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                 stat.size_diff, stat.count_diff)
+                for stat in allocations
+            ]
+        }
+    
+    def _sample(self, loop, loop_thread: int, stop: threading.Event, counters: Dict):
+        own_thread = threading.get_ident()
+        names = {}
+        while not stop.wait(self.config.PROFILE_INTERVAL):
+            counters['samples'] += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                
+                leaf = frame.f_code
+                if thread_id == loop_thread:
+                    if leaf.co_name in IDLE_FUNCTIONS:
+                        continue
+                    counters['loop_busy'] += 1
+                    task = asyncio.current_task(loop)
+                    counters['tasks'][_task_label(task) if task else '<event loop>'] += 1
+                else:
+                    if leaf.co_name in IDLE_FUNCTIONS or leaf.co_name in ('wait', '_worker'):
+                        continue
+                    if thread_id not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    counters['threads'][names.get(thread_id, str(thread_id))] += 1
+                
+                counters['self'][_label(leaf)] += 1
+                seen = set()
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename.startswith(PROJECT_DIR) and code not in seen:
+                        seen.add(code)
+                        counters['cumulative'][_label(code)] += 1
+                    frame = frame.f_back
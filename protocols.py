@@ -0,0 +1,188 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from typing import Optional, Dict
+from urllib.parse import quote, unquote, parse_qsl, urlencode
+
+PROTOCOL_NAMES = {
+    'vless': 'VLESS',
+    'vmess': 'VMess',
+    'trojan': 'Trojan',
+    'ss': 'Shadowsocks'
+}
+
+@dataclass(slots=True)
+class ParsedLink:
+    protocol: str
+    server: str
+    port: int
+    credential: str = ''
+    transport: str = 'tcp'
+    security: str = 'none'
+    sni: str = ''
+    remark: str = ''
+    method: str = ''
+    params: Dict[str, str] = field(default_factory=dict)
+    
+    @property
+    def type_name(self) -> str:
+        return PROTOCOL_NAMES[self.protocol]
+    
+    def fingerprint(self) -> str:
+        return f"{self.protocol}://{self.credential}@{self.server.lower()}:{self.port}"
+    
+    def to_uri(self) -> str:
+        if self.protocol == 'vmess':
+            return _vmess_to_uri(self)
+        
+        host = f"[{self.server}]" if ':' in self.server else self.server
+        if self.protocol == 'ss':
+            userinfo = _b64encode(f"{self.method}:{self.credential}")
+        else:
+            userinfo = quote(self.credential, safe='')
+        
+        uri = f"{self.protocol}://{userinfo}@{host}:{self.port}"
+        if self.params:
+            uri += ('/?' if self.protocol == 'ss' else '?') + urlencode(self.params, safe='/,:')
+        if self.remark:
+            uri += '#' + quote(self.remark, safe='')
+        return uri
+
+def parse_link(link: str) -> Optional[ParsedLink]:
+    scheme, sep, rest = link.strip().partition('://')
+    scheme = scheme.lower()
+    if not sep or scheme not in PROTOCOL_NAMES:
+        return None
+    
+    try:
+        if scheme == 'vmess':
+            return _parse_vmess(rest)
+        if scheme == 'ss':
+            return _parse_ss(rest)
+        return _parse_standard(scheme, rest)
+    except (ValueError, KeyError, TypeError, UnicodeDecodeError, binascii.Error):
+        return None
+
+def _b64decode(data: str) -> bytes:
+    data = data.strip().replace('-', '+').replace('_', '/')
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+def _b64encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+def _split_fragment(rest: str):
+    body, _, fragment = rest.partition('#')
+    return body, unquote(fragment).strip()
+
+def _split_host_port(hostport: str):
+    if hostport.startswith('['):
+        host, _, port = hostport[1:].partition(']')
+        port = port.lstrip(':')
+    else:
+        host, _, port = hostport.rpartition(':')
+    if not host or not port:
+        raise ValueError(f"Invalid host/port: {hostport}")
+    port = int(port)
+    if not 0 < port < 65536:
+        raise ValueError(f"Invalid port: {port}")
+    return host, port
+
+def _parse_standard(scheme: str, rest: str) -> ParsedLink:
+    body, remark = _split_fragment(rest)
+    body, _, query = body.partition('?')
+    userinfo, _, hostport = body.rpartition('@')
+    if not userinfo:
+        raise ValueError("Missing credential")
+    
+    server, port = _split_host_port(hostport.rstrip('/'))
+    params = dict(parse_qsl(query, keep_blank_values=True))
+    default_security = 'tls' if scheme == 'trojan' else 'none'
+    
+    return ParsedLink(
+        protocol=scheme,
+        server=server,
+        port=port,
+        credential=unquote(userinfo),
+        transport=params.get('type') or 'tcp',
+        security=params.get('security') or default_security,
+        sni=params.get('sni') or params.get('peer') or params.get('host', ''),
+        remark=remark,
+        params=params
+    )
+
+def _parse_ss(rest: str) -> ParsedLink:
+    body, remark = _split_fragment(rest)
+    body, _, query = body.partition('?')
+    body = body.rstrip('/')
+    
+    if '@' not in body:
+        body = _b64decode(body).decode('utf-8')
+        userinfo, _, hostport = body.rpartition('@')
+        method, _, password = userinfo.partition(':')
+    else:
+        userinfo, _, hostport = body.rpartition('@')
+        userinfo = unquote(userinfo)
+        if ':' in userinfo:
+            method, _, password = userinfo.partition(':')
+        else:
+            method, _, password = _b64decode(userinfo).decode('utf-8').partition(':')
+    
+    if not method or not password:
+        raise ValueError("Missing Shadowsocks method or password")
+    
+    server, port = _split_host_port(hostport)
+    params = dict(parse_qsl(query, keep_blank_values=True))
+    
+    return ParsedLink(
+        protocol='ss',
+        server=server,
+        port=port,
+        credential=password,
+        transport='tcp',
+        security='none',
+        remark=remark,
+        method=method,
+        params=params
+    )
+
+def _parse_vmess(rest: str) -> ParsedLink:
+    body, fragment = _split_fragment(rest)
+    if '@' in body:
+        parsed = _parse_standard('vmess', rest)
+        parsed.security = parsed.params.get('security') or parsed.params.get('tls') or 'none'
+        return parsed
+    
+    data = json.loads(_b64decode(body))
+    port = int(data['port'])
+    if not 0 < port < 65536:
+        raise ValueError(f"Invalid port: {port}")
+    
+    return ParsedLink(
+        protocol='vmess',
+        server=str(data['add']).strip(),
+        port=port,
+        credential=str(data.get('id', '')),
+        transport=data.get('net') or 'tcp',
+        security=data.get('tls') or 'none',
+        sni=data.get('sni') or data.get('host') or '',
+        remark=str(data.get('ps') or fragment),
+        method=data.get('scy') or 'auto',
+        params={k: str(v) for k, v in data.items() if k not in ('add', 'port', 'id', 'net', 'tls', 'sni', 'ps', 'scy')}
+    )
+
+def _vmess_to_uri(parsed: ParsedLink) -> str:
+    data = {
+        'v': '2',
+        'ps': parsed.remark,
+        'add': parsed.server,
+        'port': str(parsed.port),
+        'id': parsed.credential,
+        'scy': parsed.method or 'auto',
+        'net': parsed.transport,
+        'tls': '' if parsed.security == 'none' else parsed.security,
+        'sni': parsed.sni
+    }
+    data.update(parsed.params)
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return 'vmess://' + base64.b64encode(payload.encode()).decode()
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import List, Set, Tuple, Union
+
+from telegram import InlineKeyboardMarkup, InputMediaDocument
+from telegram.error import BadRequest, RetryAfter
+
+from logs import log_context
+from models import ConfigRecord
+from sender import TIME_PLACEHOLDER
+
+logger = logging.getLogger(__name__)
+
+DIGEST_RENDER = 'digest'
+
+def _digest(value: str) -> str:
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+class MessageRefresher:
+    def __init__(self, db, sender, keyboard, config):
+        self.db = db
+        self.sender = sender
+        self.keyboard = keyboard
+        self.config = config
+        self.pending: Set[str] = set()
+    
+    def render(self, cfg: ConfigRecord) -> Tuple[str, InlineKeyboardMarkup, str]:
+        text = self.sender.config_text(cfg)
+        markup = self.keyboard.config_buttons(cfg.id)
+        # The send time never changes once posted, so the text hash is taken without it and matches prerender
+        template = self.sender.format_config_text(cfg, TIME_PLACEHOLDER)
+        return text, markup, f"{_digest(template)}:{_digest(self.markup_json(markup))}"
+    
+    @staticmethod
+    def markup_json(markup: InlineKeyboardMarkup) -> str:
+        return json.dumps(markup.to_dict(), sort_keys=True, ensure_ascii=False)
+    
+    def prerender(self, configs: List[ConfigRecord]):
+        for cfg in configs:
+            self.sender.prerender(cfg)
+            cfg.rendered_markup = self.markup_json(self.keyboard.config_buttons(cfg.id))
+            cfg.render_hash = f"{_digest(cfg.rendered_text)}:{_digest(cfg.rendered_markup)}"
+    
+    def prepared(self, cfg: ConfigRecord) -> Tuple[str, Union[InlineKeyboardMarkup, str], str]:
+        # Send path: a current pre-render only needs the send time filled in; the markup goes out as stored JSON
+        if cfg.rendered_markup and cfg.render_hash and self.sender.is_prerendered(cfg):
+            return self.sender.config_text(cfg), cfg.rendered_markup, cfg.render_hash
+        return self.render(cfg)
+    
+    async def prerender_queue(self) -> int:
+        version = self.sender.render_version
+        rendered = 0
+        last_id = 0
+        while True:
+            configs = await self.db.get_stale_renders(version, last_id)
+            if not configs:
+                break
+            await asyncio.to_thread(self.prerender, configs)
+            await self.db.set_rendered_texts(configs)
+            rendered += len(configs)
+            last_id = configs[-1].id
+        
+        if rendered:
+            logger.info("Pre-rendered %s queued configs for render version %s", rendered, version)
+        return rendered
+    
+    def mark(self, uuid: str):
+        self.pending.add(uuid)
+    
+    async def run(self, bot):
+        while True:
+            await asyncio.sleep(self.config.REFRESH_INTERVAL)
+            if not self.pending:
+                continue
+            try:
+                await self.flush(bot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Refresh failed: %s", e)
+    
+    async def flush(self, bot) -> int:
+        uuids, self.pending = self.pending, set()
+        configs = await self.db.get_configs_by_uuids(list(uuids))
+        
+        hashes = {}
+        for cfg in configs:
+            if not (cfg.channel_id and cfg.message_id) or cfg.render_hash == DIGEST_RENDER:
+                continue
+            
+            text, markup, render_hash = self.render(cfg)
+            if render_hash == cfg.render_hash:
+                continue
+            
+            old_text_hash = (cfg.render_hash or ':').split(':')[0]
+            with log_context(config_uuid=cfg.uuid):
+                if await self.edit(bot, cfg, text, markup, text_changed=render_hash.split(':')[0] != old_text_hash):
+                    hashes[cfg.uuid] = render_hash
+            await asyncio.sleep(self.config.EDIT_INTERVAL)
+        
+        await self.db.set_render_hashes(hashes)
+        if hashes:
+            logger.info("Refreshed %s of %s marked messages", len(hashes), len(uuids))
+        return len(hashes)
+    
+    async def refresh_digest(self, bot, channel_id: str, message_id: int) -> bool:
+        siblings = await self.db.get_configs_on_message(channel_id, message_id)
+        if not siblings:
+            try:
+                await bot.delete_message(chat_id=channel_id, message_id=message_id)
+            except Exception as e:
+                logger.error("Failed to delete message %s in %s: %s", message_id, channel_id, e)
+            return False
+        
+        markup = self.keyboard.digest_buttons([cfg.id for cfg in siblings])
+        try:
+            try:
+                await bot.edit_message_text(
+                    chat_id=channel_id,
+                    message_id=message_id,
+                    text=self.sender.format_digest_text(siblings),
+                    parse_mode='HTML',
+                    reply_markup=markup
+                )
+            except BadRequest as e:
+                if 'no text' not in str(e).lower():
+                    raise
+                # File digests are rebuilt too, otherwise the removed link would still be in the attachment
+                document, caption = self.sender.build_digest_file(siblings)
+                await bot.edit_message_media(
+                    chat_id=channel_id,
+                    message_id=message_id,
+                    media=InputMediaDocument(document, caption=caption, parse_mode='HTML'),
+                    reply_markup=markup
+                )
+            return True
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                return True
+            logger.error("Failed to re-render digest %s in %s: %s", message_id, channel_id, e)
+        except Exception as e:
+            logger.error("Failed to re-render digest %s in %s: %s", message_id, channel_id, e)
+        return False
+    
+    async def edit(self, bot, cfg: ConfigRecord, text: str, markup: InlineKeyboardMarkup, text_changed: bool) -> bool:
+        try:
+            if text_changed:
+                await bot.edit_message_text(
+                    chat_id=cfg.channel_id,
+                    message_id=cfg.message_id,
+                    text=text,
+                    parse_mode='HTML',
+                    reply_markup=markup
+                )
+            else:
+                await bot.edit_message_reply_markup(
+                    chat_id=cfg.channel_id,
+                    message_id=cfg.message_id,
+                    reply_markup=markup
+                )
+            return True
+        except RetryAfter as e:
+            logger.warning("Edit rate limited, retrying %s in %ss", cfg.uuid, e.retry_after)
+            self.pending.add(cfg.uuid)
+            await asyncio.sleep(e.retry_after)
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                return True
+            logger.error("Failed to edit message %s in %s: %s", cfg.message_id, cfg.channel_id, e)
+        except Exception as e:
+            logger.error("Failed to edit message %s in %s: %s", cfg.message_id, cfg.channel_id, e)
+        return False
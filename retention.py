@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from send_calendar import utc_now
+
+logger = logging.getLogger(__name__)
+
+class Retention:
+    def __init__(self, db, config):
+        self.db = db
+        self.config = config
+    
+    async def run(self):
+        while True:
+            try:
+                await self.db.prune_hourly_stats(self.config.STATS_HOURLY_DAYS)
+                archived = await self.archive()
+                if archived:
+                    await self.vacuum()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Retention run failed: %s", e)
+            
+            await asyncio.sleep(self.config.RETENTION_INTERVAL)
+    
+    async def archive(self) -> int:
+        if self.config.RETENTION_DAYS <= 0:
+            return 0
+        
+        cutoff = (utc_now() - timedelta(days=self.config.RETENTION_DAYS)).isoformat(timespec='seconds')
+        total = 0
+        while True:
+            archived = await self.db.archive_configs(
+                self.config.ARCHIVE_DATABASE_PATH, cutoff, self.config.RETENTION_BATCH_SIZE
+            )
+            total += archived
+            if archived < self.config.RETENTION_BATCH_SIZE:
+                break
+            await asyncio.sleep(self.config.VACUUM_PAUSE)
+        
+        if total:
+            logger.info("Archived %s configs sent before %s", total, cutoff)
+        return total
+    
+    async def vacuum(self) -> int:
+        slices = 0
+        while True:
+            remaining = await self.db.incremental_vacuum(self.config.VACUUM_PAGES)
+            slices += 1
+            if not remaining:
+                break
+            await asyncio.sleep(self.config.VACUUM_PAUSE)
+        
+        logger.info("Incremental vacuum released free pages in %s slices", slices)
+        return slices
@@ -0,0 +1,72 @@
+import heapq
+import math
+import random
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+from models import ConfigRecord
+from send_calendar import utc_now
+
+class SendScheduler:
+    def __init__(self, config):
+        self.config = config
+    
+    def quality_score(self, cfg: ConfigRecord) -> float:
+        try:
+            ping = float(cfg.ping.replace('ms', '').strip())
+        except (AttributeError, ValueError):
+            return 0.3
+        return max(0.0, 1.0 - min(ping, 1000.0) / 1000.0)
+    
+    def freshness_score(self, cfg: ConfigRecord, now: datetime) -> float:
+        try:
+            created = datetime.fromisoformat(cfg.created_at)
+        except (TypeError, ValueError):
+            return 0.5
+        # created_at defaults to SQLite's CURRENT_TIMESTAMP, which is naive UTC
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        age_days = max(0.0, (now - created).total_seconds() / 86400)
+        return math.exp(-age_days / 3)
+    
+    def base_score(self, cfg: ConfigRecord, now: datetime, server_reports: Dict[str, int]) -> float:
+        reports = cfg.bad_reports + cfg.probe_failures + server_reports.get(cfg.server, 0)
+        return (
+            self.config.SCORE_WEIGHT_QUALITY * self.quality_score(cfg)
+            + self.config.SCORE_WEIGHT_FRESHNESS * self.freshness_score(cfg, now)
+            - self.config.SCORE_WEIGHT_REPORTS * math.log1p(reports)
+            + self.config.SCORE_JITTER * random.random()
+        )
+    
+    def select(self, pool: List[ConfigRecord], k: int,
+               server_reports: Optional[Dict[str, int]] = None) -> List[ConfigRecord]:
+        if k <= 0 or not pool:
+            return []
+        
+        now = utc_now()
+        server_reports = server_reports or {}
+        heap = [(-self.base_score(cfg, now, server_reports), 0.0, i) for i, cfg in enumerate(pool)]
+        heapq.heapify(heap)
+        
+        protocols, locations, servers = Counter(), Counter(), Counter()
+        selected = []
+        
+        while heap and len(selected) < k:
+            neg_base, penalty, i = heapq.heappop(heap)
+            cfg = pool[i]
+            current = (
+                self.config.DIVERSITY_PROTOCOL * protocols[cfg.type]
+                + self.config.DIVERSITY_LOCATION * locations[cfg.location]
+                + self.config.DIVERSITY_SERVER * servers[cfg.server]
+            )
+            if current > penalty:
+                heapq.heappush(heap, (neg_base + current - penalty, current, i))
+                continue
+            
+            selected.append(cfg)
+            protocols[cfg.type] += 1
+            locations[cfg.location] += 1
+            servers[cfg.server] += 1
+        
+        return selected
@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from models import CONFIG_SELECT, config_row_factory
+
+# Compares holding a pending queue as dict(sqlite3.Row), the pre-ConfigRecord shape, with ConfigRecord rows
+
+def fill(path: str, rows: int):
+    asyncio.run(Database(path).init())
+    db = sqlite3.connect(path)
+    db.executemany('''
+        INSERT INTO configs (uuid, type, link, server, port, location, ping, quality, source, fingerprint)
+        VALUES (?, 'VLESS', ?, ?, 443, '🇩🇪 Germany', '120ms', '🟢 Excellent', 'NONEcore', ?)
+    ''', (
+        (str(uuid.uuid4()), f"vless://{uuid.uuid4()}@host{i}.example.com:443?security=tls&type=ws#cfg{i}",
+         f"host{i}.example.com", f"vless://{i}@host{i}.example.com:443")
+        for i in range(rows)
+    ))
+    db.commit()
+    db.close()
+
+def load(path: str, factory):
+    db = sqlite3.connect(path)
+    db.row_factory = factory
+    try:
+        return db.execute(f'SELECT {CONFIG_SELECT} FROM configs WHERE message_id IS NULL ORDER BY id').fetchall()
+    finally:
+        db.close()
+
+def measure(path: str, name: str, factory, convert) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = [convert(row) for row in load(path, factory)]
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(rows)
+    del rows
+    print(f"{name:<14} {size / count:8.0f} B/config  {elapsed:6.2f} s  ({count} rows)")
+    return size / count, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory and time for loading the pending queue')
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'bench.db')
+        fill(path, args.rows)
+        dict_size, dict_time = measure(path, 'dict(Row)', sqlite3.Row, dict)
+        record_size, record_time = measure(path, 'ConfigRecord', config_row_factory, lambda row: row)
+    
+    print(f"ConfigRecord uses {1 - record_size / dict_size:.0%} less memory and {1 - record_time / dict_time:.0%} less time")
+
+if __name__ == '__main__':
+    main()
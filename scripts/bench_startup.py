@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('bs4', 'lxml.etree', 'aiohttp')
+
+# Runs in a fresh interpreter: the same startup work as main(), minus run_polling and the network
+CHILD = r'''
+import asyncio
+import json
+import sys
+import time
+
+started = time.perf_counter()
+import main
+from telegram.ext import Application
+imported = time.perf_counter()
+
+bot = main.NonecoreBot()
+asyncio.run(bot.init())
+initialized = time.perf_counter()
+
+Application.builder().application_class(main.ContextApplication).token(main.Config.BOT_TOKEN).build()
+built = time.perf_counter()
+
+print(json.dumps({
+    'import': imported - started,
+    'init': initialized - imported,
+    'build': built - initialized,
+    'modules': [name for name in sys.argv[1:] if name in sys.modules]
+}))
+'''
+
+def run_once(folder: str) -> dict:
+    env = dict(
+        os.environ,
+        BOT_TOKEN='123456:benchmark',
+        DATABASE_PATH=os.path.join(folder, 'nonecore.db'),
+        ARCHIVE_DATABASE_PATH=os.path.join(folder, 'nonecore_archive.db'),
+        FINGERPRINT_FILTER_PATH=os.path.join(folder, 'fingerprints.bloom'),
+        BACKUP_DIR=os.path.join(folder, 'backups'),
+        LOG_FORMAT='text'
+    )
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, *HEAVY_MODULES],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True
+    )
+    total = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'startup failed')
+    
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['total'] = total
+    return timings
+
+def report(label: str, runs: list):
+    phases = ('total', 'import', 'init', 'build')
+    medians = '  '.join(f"{phase} {statistics.median(run[phase] for run in runs) * 1000:6.0f} ms" for phase in phases)
+    print(f"{label:<12} {medians}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Process launch to ready-to-poll time, in fresh interpreters')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    
+    fresh, existing = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as folder:
+            fresh.append(run_once(folder))
+    with tempfile.TemporaryDirectory() as folder:
+        run_once(folder)
+        for _ in range(args.runs):
+            existing.append(run_once(folder))
+    
+    report('new db', fresh)
+    report('existing db', existing)
+    loaded = sorted({name for run in fresh + existing for name in run['modules']})
+    print(f"heavy modules loaded at startup: {', '.join(loaded) if loaded else 'none'}")
+    print("Launch to first handled update needs a live token; the bot logs it as 'First update handled'.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import math
+from datetime import datetime, timedelta, timezone
+from typing import List, Set, Tuple, Optional
+from zoneinfo import ZoneInfo
+
+def parse_hours(spec: str) -> Set[int]:
+    hours = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(x) % 24 for x in part.split('-', 1))
+            hour = start
+            while hour != end:
+                hours.add(hour)
+                hour = (hour + 1) % 24
+        else:
+            hours.add(int(part) % 24)
+    return hours
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def daily_room(daily_limit: int, sent_today: int) -> int:
+    # How many more configs the day's limit allows; zero means a send run stops until it is triggered again
+    return max(0, daily_limit - sent_today)
+
+def batch_width(batch_size: int, digest_size: int) -> int:
+    # Configs per batch, rounded up to whole digests so a digest is never split across batches
+    group_size = digest_size if digest_size > 1 else 1
+    return max(1, math.ceil(max(1, batch_size) / group_size)) * group_size
+
+def local_now(tz: ZoneInfo) -> datetime:
+    return datetime.now(tz)
+
+def local_day_bounds(tz: ZoneInfo, day: Optional[str] = None) -> Tuple[datetime, datetime]:
+    if day:
+        start = datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=tz)
+    else:
+        start = local_now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=1)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+class SendCalendar:
+    def __init__(self, config):
+        self.tz = ZoneInfo(config.TIMEZONE)
+        self.quiet_hours = parse_hours(config.QUIET_HOURS)
+        self.peak_hours = parse_hours(config.PEAK_HOURS)
+        self.peak_boost = config.PEAK_BOOST
+        self.daily_limit = None
+        self.quotas: List[int] = [0] * 24
+        self.cumulative: List[int] = [0] * 24
+    
+    def now(self) -> datetime:
+        return local_now(self.tz)
+    
+    def today(self) -> str:
+        return self.now().strftime('%Y-%m-%d')
+    
+    def build(self, daily_limit: int):
+        if daily_limit == self.daily_limit:
+            return
+        
+        weights = [
+            0.0 if hour in self.quiet_hours else (self.peak_boost if hour in self.peak_hours else 1.0)
+            for hour in range(24)
+        ]
+        total_weight = sum(weights) or 1.0
+        shares = [daily_limit * w / total_weight for w in weights]
+        quotas = [int(share) for share in shares]
+        
+        leftover = daily_limit - sum(quotas) if sum(weights) else 0
+        by_remainder = sorted(range(24), key=lambda h: shares[h] - quotas[h], reverse=True)
+        for hour in by_remainder[:leftover]:
+            quotas[hour] += 1
+        
+        running = 0
+        cumulative = []
+        for quota in quotas:
+            running += quota
+            cumulative.append(running)
+        
+        self.daily_limit = daily_limit
+        self.quotas = quotas
+        self.cumulative = cumulative
+    
+    def allowance(self, now: datetime, sent_today: int) -> int:
+        hour = now.astimezone(self.tz).hour
+        if not self.quotas[hour]:
+            return 0
+        return max(0, min(self.cumulative[hour], self.daily_limit) - sent_today)
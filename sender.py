@@ -1,33 +1,79 @@
+import hashlib
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from zoneinfo import ZoneInfo
+from typing import Dict, Any, List, Optional, Tuple
 from io import BytesIO
 
+from models import ConfigRecord
+
 logger = logging.getLogger(__name__)
 
+# Bump when the built-in config message or button layout changes so queued pre-renders are rebuilt
+LAYOUT_VERSION = 2
+TIME_PLACEHOLDER = '\x00time\x00'
+
 class Sender:
     def __init__(self, config):
         self.config = config
+        self.render_version = hashlib.blake2b(
+            '\x1f'.join((
+                str(LAYOUT_VERSION), config.CONFIG_TEXT_TEMPLATE, config.BRAND_NAME, config.BRAND_CHANNEL
+            )).encode('utf-8'),
+            digest_size=6
+        ).hexdigest()
+    
+    def render_time(self, cfg: ConfigRecord) -> str:
+        tz = ZoneInfo(self.config.TIMEZONE)
+        try:
+            moment = datetime.fromisoformat(cfg.sent_at)
+            if moment.tzinfo:
+                moment = moment.astimezone(tz)
+        except (TypeError, ValueError):
+            moment = datetime.now(tz)
+        return moment.strftime('%Y-%m-%d %H:%M')
+    
+    def prerender(self, cfg: ConfigRecord):
+        cfg.rendered_text = self.format_config_text(cfg, TIME_PLACEHOLDER)
+        cfg.render_version = self.render_version
+    
+    def is_prerendered(self, cfg: ConfigRecord) -> bool:
+        return bool(cfg.rendered_text and cfg.render_version == self.render_version
+                    and cfg.bad_reports < self.config.REFRESH_REPORT_THRESHOLD and not cfg.probe_failures)
+    
+    def config_text(self, cfg: ConfigRecord) -> str:
+        if self.is_prerendered(cfg):
+            return cfg.rendered_text.replace(TIME_PLACEHOLDER, self.render_time(cfg))
+        return self.format_config_text(cfg)
     
-    def format_config_text(self, cfg: Dict[str, Any]) -> str:
+    def format_config_text(self, cfg: ConfigRecord, sent_time: Optional[str] = None) -> str:
+        sent_time = sent_time or self.render_time(cfg)
+        if cfg.bad_reports >= self.config.REFRESH_REPORT_THRESHOLD:
+            status = '⚠️ کاربران خرابی این کانفیگ را گزارش کرده‌اند'
+        elif cfg.probe_failures:
+            status = '⚠️ در آخرین بررسی پاسخ نداد'
+        else:
+            status = '✅ تا این لحظه فعال'
+        
         if self.config.CONFIG_TEXT_TEMPLATE:
             try:
                 return self.config.CONFIG_TEXT_TEMPLATE.format(
-                    type=cfg['type'],
-                    location=cfg['location'],
-                    ping=cfg['ping'],
-                    quality=cfg['quality'],
-                    link=cfg['link'],
-                    time=datetime.now().strftime('%Y-%m-%d %H:%M'),
+                    type=cfg.type,
+                    location=cfg.location,
+                    ping=cfg.ping,
+                    quality=cfg.quality,
+                    link=cfg.link,
+                    time=sent_time,
+                    status=status,
                     brand=self.config.BRAND_NAME,
                     channel=self.config.BRAND_CHANNEL,
-                    server=cfg['server'],
-                    port=cfg['port']
+                    server=cfg.server,
+                    port=cfg.port
                 )
             except Exception as e:
                 logger.error(f"Template error: {e}")
         
-        location_clean = cfg['location'].replace(' ', '').replace('🇩🇪', 'Germany').replace('🇳🇱', 'Netherlands').replace('🇺🇸', 'USA')
+        location_clean = cfg.location.replace(' ', '').replace('🇩🇪', 'Germany').replace('🇳🇱', 'Netherlands').replace('🇺🇸', 'USA')
         loc_for_hashtag = location_clean.replace('🇩🇪', '').replace('🇳🇱', '').replace('🇺🇸', '').replace('🇬🇧', '').replace('🇫🇷', '').strip()
         
         return f"""┏━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━┓
@@ -35,19 +81,48 @@ class Sender:
 ┃  ⚡️ کانال: {self.config.BRAND_CHANNEL}      ┃
 ┗━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━┛
 
-📂 کانفیگ {cfg['type']}
-📍 لوکیشن: {cfg['location']}  
-📶 پینگ: {cfg['ping']} {cfg['quality']}
+📂 کانفیگ {cfg.type}
+📍 لوکیشن: {cfg.location}  
+📶 پینگ: {cfg.ping} {cfg.quality}
+
+#{cfg.type} #VPN #{self.config.BRAND_NAME} #{loc_for_hashtag}
+
+🕒 {sent_time}
 
-#{cfg['type']} #VPN #{self.config.BRAND_NAME} #{loc_for_hashtag}
+<code>{cfg.link}</code>
 
-🕒 {datetime.now().strftime('%Y-%m-%d %H:%M')}
+⚡️ بررسی: {status}
+🔗 بفرست برای بقیه: {self.config.BRAND_CHANNEL}"""
+    
+    def format_digest_entry(self, index: int, cfg: ConfigRecord, with_link: bool = True) -> str:
+        entry = f"{index}. {cfg.type} | {cfg.location} | 📶 {cfg.ping} {cfg.quality}"
+        if with_link:
+            entry += f"\n<code>{cfg.link}</code>"
+        return entry
+    
+    def format_digest_text(self, configs: List[ConfigRecord]) -> str:
+        entries = '\n\n'.join(self.format_digest_entry(i, cfg) for i, cfg in enumerate(configs, 1))
+        return f"""🔷 {self.config.BRAND_NAME} | {len(configs)} کانفیگ جدید
+⚡️ کانال: {self.config.BRAND_CHANNEL}
 
-<code>{cfg['link']}</code>
+{entries}
 
-⚡️ بررسی: ✅ تا این لحظه فعال
+🕒 {self.render_time(configs[0])}
 🔗 بفرست برای بقیه: {self.config.BRAND_CHANNEL}"""
     
+    def build_digest_file(self, configs: List[ConfigRecord]) -> Tuple[BytesIO, str]:
+        entries = '\n'.join(self.format_digest_entry(i, cfg, with_link=False) for i, cfg in enumerate(configs, 1))
+        caption = f"""📄 {len(configs)} کانفیگ {self.config.BRAND_NAME} در یک فایل
+فایل را در v2rayNG / Nekoray ایمپورت کنید.
+
+{entries}
+
+🔗 {self.config.BRAND_CHANNEL}"""
+        
+        buffer = BytesIO('\n'.join(cfg.link for cfg in configs).encode('utf-8'))
+        buffer.name = f"{self.config.BRAND_NAME}-{self.render_time(configs[0]).replace(' ', '_').replace(':', '')}.txt"
+        return buffer, caption[:1024]
+    
     def get_remark(self) -> str:
         return self.config.CONFIG_REMARK or f"{self.config.BRAND_NAME} | تلگرام: {self.config.BRAND_CHANNEL}"
     
@@ -59,6 +134,7 @@ class Sender:
 📤 امروز: {stats['today_configs']} کانفیگ
 📈 کل: {stats['total_configs']} کانفیگ  
 📋 در صف: {stats['queue']} کانفیگ
+🗄 بایگانی: {stats.get('archived_configs', 0)} کانفیگ
 
 👥 کاربران جدید امروز: {stats.get('new_members', 0)} نفر
 👤 کل اعضا: {stats.get('total_members', 0)} نفر
@@ -70,15 +146,122 @@ class Sender:
 🌍 لوکیشن‌های امروز:
 {locations_text}"""
     
-    def format_queue_status(self, queue_count: int, batch_size: int, interval: int, delay: int) -> str:
-        if queue_count == 0:
+    def format_report(self, report: Dict[str, Any]) -> str:
+        def rate(part: int, whole: int) -> str:
+            return f"{part / whole * 100:.1f}%" if whole else "—"
+        
+        def breakdown(groups: Dict[str, Dict[str, int]]) -> str:
+            rows = sorted(groups.items(), key=lambda item: item[1]['sent'], reverse=True)[:10]
+            lines = [
+                f"• {name}: {counts['sent']} ارسال | کپی {rate(counts['copies'], counts['sent'])} | گزارش {rate(counts['reports'], counts['sent'])}"
+                for name, counts in rows if counts['sent'] or counts['added']
+            ]
+            return '\n'.join(lines) or "• هیچ"
+        
+        return f"""📈 گزارش {report['days']} روز اخیر
+
+📥 اضافه شده: {report['added']} کانفیگ
+📤 ارسال شده: {report['sent']} کانفیگ
+📋 نرخ کپی: {rate(report['copies'], report['sent'])} ({report['copies']} کپی)
+🔴 نرخ گزارش خرابی: {rate(report['reports'], report['sent'])} ({report['reports']} گزارش)
+
+🧩 پروتکل‌ها:
+{breakdown(report['protocol'])}
+
+🌍 لوکیشن‌ها:
+{breakdown(report['location'])}"""
+    
+    def format_growth_report(self, report: Dict[str, Any]) -> str:
+        def corr(value) -> str:
+            return f"{value:+.2f}" if value is not None else "داده کافی نیست"
+        
+        hours_text = '\n'.join(
+            f"• ساعت {hour:02d}: {net:+.1f} عضو/ساعت با میانگین {sent:.1f} ارسال"
+            for hour, (sent, net) in report['best_hours']
+        ) or "• هیچ"
+        
+        return f"""👥 رشد کانال در {report['days']} روز اخیر
+
+👤 کل اعضا: {report['total_members']} نفر
+➕ عضو شده: {report['joins']} نفر
+➖ خارج شده: {report['leaves']} نفر
+📈 خالص: {report['joins'] - report['leaves']:+d} نفر
+
+🔗 همبستگی ارسال با رشد (همان ساعت): {corr(report['correlation'])}
+🔗 همبستگی ارسال با رشد (ساعت بعد): {corr(report['lagged_correlation'])}
+
+⏰ بهترین ساعت‌ها برای رشد:
+{hours_text}"""
+    
+    def format_profile(self, profile: Dict[str, Any]) -> str:
+        samples = profile['samples'] or 1
+        
+        def rows(items) -> str:
+            return '\n'.join(f"• {count / samples * 100:4.1f}% {name}" for name, count in items) or "• هیچ"
+        
+        allocations = '\n'.join(
+            f"• +{size / 1024:.1f} KB ({count:+d}) {site}" for site, size, count in profile['allocations']
+        ) or ("• هیچ" if profile['memory'] else "• غیرفعال (حالت cpu)")
+        
+        return f"""🔬 پروفایل {profile['seconds']:.1f} ثانیه ({profile['samples']} نمونه)
+⚙️ اشغال event loop: {profile['loop_busy'] * 100:.1f}%
+
+🔥 توابع پرمصرف (self):
+{rows(profile['self'])}
+
+📚 توابع پرمصرف پروژه (cumulative):
+{rows(profile['cumulative'])}
+
+🧵 تسک‌های async:
+{rows(profile['tasks'])}
+
+🧶 تردهای کمکی:
+{rows(profile['threads'])}
+
+💾 بیشترین تخصیص حافظه:
+{allocations}"""
+    
+    def format_queue_status(self, forecast: Dict[str, Any]) -> str:
+        if forecast['queue'] == 0:
             return "✅ هیچ کانفیگی در صف نیست."
         
-        batches = (queue_count + batch_size - 1) // batch_size
-        total_seconds = batches * (interval + delay)
-        minutes = total_seconds // 60
+        finished_at = forecast['finished_at']
+        if forecast['stopped_at_limit']:
+            eta = f"توقف در سقف روزانه، {forecast['queue'] - forecast['sent']} تا ارسال بعدی می‌ماند"
+        elif finished_at is None:
+            eta = f"بیش از {forecast['horizon_days']} روز"
+        else:
+            eta = finished_at.strftime('%Y-%m-%d %H:%M')
+        
+        days_text = ' | '.join(f"{day[5:]}: {count}" for day, count in forecast['days'][:4])
+        if len(forecast['days']) > 4:
+            days_text += f" | … ({len(forecast['days'])} روز)"
         
-        return f"📋 {queue_count} در صف | ⏱️ ~{minutes} دقیقه تا اتمام"
+        return f"📋 {forecast['queue']} در صف | ⏱️ اتمام: {eta}\n📅 {days_text}"
+    
+    def format_forecast(self, forecast: Dict[str, Any], settings, elapsed: float) -> str:
+        days_text = '\n'.join(f"• {day}: {count} کانفیگ" for day, count in forecast['days'][:14]) or "• هیچ"
+        if len(forecast['days']) > 14:
+            days_text += f"\n• … و {len(forecast['days']) - 14} روز دیگر"
+        finished_at = forecast['finished_at']
+        if forecast['stopped_at_limit']:
+            eta = f"ارسال در سقف روزانه متوقف می‌شود و {forecast['queue'] - forecast['sent']} کانفیگ تا ارسال دستی بعدی در صف می‌ماند"
+        else:
+            eta = finished_at.strftime('%Y-%m-%d %H:%M') if finished_at else f"بیش از {forecast['horizon_days']} روز"
+        
+        return f"""🧪 شبیه‌سازی ارسال ({'خودکار طبق تقویم' if forecast['auto_send'] else 'دستی'})
+
+• batch: {settings.batch_size} | فاصله: {settings.interval}s | تأخیر: {settings.delay}s
+• سقف روزانه: {settings.daily_limit} | دایجست: {settings.digest_size or 'خاموش'}
+• تأخیر اندازه‌گیری‌شده تلگرام: {forecast['latency']:.2f}s
+
+📋 {forecast['sent']} از {forecast['queue']} کانفیگ در {forecast['messages']} پیام
+⏱️ اتمام صف: {eta}
+
+📅 پیش‌بینی روزانه:
+{days_text}
+
+⚡ محاسبه در {elapsed * 1000:.0f} میلی‌ثانیه"""
     
     def format_settings(self, settings: Dict[str, str]) -> str:
         return f"""⚙️ تنظیمات فعلی:
@@ -88,6 +271,8 @@ class Sender:
 • تأخیر باقیمانده: {settings.get('delay', '0')} ثانیه
 • ارسال کلاینت‌ها: {'✅' if settings.get('send_clients') == 'true' else '❌'}
 • یادآوری renewal: {'✅' if settings.get('reminder_enabled') == 'true' else '❌'}
+• ارسال خودکار (طبق تقویم): {'✅' if settings.get('auto_send') == 'true' else '❌'}
+• حالت دایجست: {f"{settings['digest_size']} کانفیگ در هر پیام ({'فایل' if settings.get('digest_format') == 'file' else 'لیست'})" if int(settings.get('digest_size', '0')) > 1 else '❌'}
 • محدودیت روزانه: {settings.get('daily_limit', '200')}"""
     
     def format_setting_changed(self, name: str, value: str, all_settings: Dict[str, str]) -> str:
@@ -0,0 +1,105 @@
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict
+
+from send_calendar import SendCalendar, batch_width, daily_room
+
+@dataclass(slots=True)
+class SimulationSettings:
+    batch_size: int
+    interval: int
+    delay: int
+    daily_limit: int
+    digest_size: int = 0
+    auto_send: bool = False
+
+class SendSimulator:
+    def __init__(self, config):
+        self.config = config
+        self.latency = config.SIMULATION_DEFAULT_LATENCY
+        self.samples = 0
+    
+    def record_latency(self, seconds: float):
+        if self.samples:
+            self.latency += self.config.SIMULATION_LATENCY_ALPHA * (seconds - self.latency)
+        else:
+            self.latency = seconds
+        self.samples += 1
+    
+    def simulate(self, queue_count: int, settings: SimulationSettings, start: datetime,
+                 sent_today: int = 0) -> Dict:
+        calendar = SendCalendar(self.config)
+        calendar.build(settings.daily_limit)
+        tz = calendar.tz
+        group_size = settings.digest_size if settings.digest_size > 1 else 1
+        batch_size = batch_width(settings.batch_size, settings.digest_size)
+        horizon = start + timedelta(days=self.config.SIMULATION_MAX_DAYS)
+        
+        clock = start
+        day = clock.astimezone(tz).date()
+        days: OrderedDict = OrderedDict()
+        remaining = queue_count
+        messages = 0
+        batch_sent = 0
+        stopped = False
+        
+        def send(count: int):
+            nonlocal clock, remaining, sent_today, messages
+            while count > 0:
+                group = min(group_size, count)
+                clock += timedelta(seconds=self.latency)
+                key = clock.astimezone(tz).strftime('%Y-%m-%d')
+                days[key] = days.get(key, 0) + group
+                remaining -= group
+                sent_today += group
+                messages += 1
+                count -= group
+                if settings.delay > 0:
+                    clock += timedelta(seconds=settings.delay)
+        
+        while remaining > 0 and clock < horizon:
+            local_day = clock.astimezone(tz).date()
+            if local_day != day:
+                day = local_day
+                sent_today = 0
+            
+            if settings.auto_send:
+                # auto_send_tick: up to one batch per tick within the hourly calendar allowance
+                tick = max(settings.interval, 10)
+                count = min(calendar.allowance(clock, sent_today), batch_size, remaining)
+                if count > 0:
+                    send(count)
+                    clock += timedelta(seconds=tick)
+                else:
+                    # The allowance only grows at the next local hour, so skip the idle ticks in between
+                    local = clock.astimezone(tz)
+                    next_hour = local.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+                    clock += timedelta(seconds=tick * max(1, math.ceil((next_hour - local).total_seconds() / tick)))
+                continue
+            
+            # Manual send: batches with interval in between; like _send_batches, the run ends at the daily limit
+            room = daily_room(settings.daily_limit, sent_today)
+            if not room:
+                stopped = True
+                break
+            
+            count = min(batch_size - batch_sent, room, remaining)
+            send(count)
+            batch_sent += count
+            if batch_sent >= batch_size and remaining > 0:
+                clock += timedelta(seconds=settings.interval)
+                batch_sent = 0
+        
+        return {
+            'queue': queue_count,
+            'sent': queue_count - remaining,
+            'messages': messages,
+            'days': list(days.items()),
+            'finished_at': clock.astimezone(tz) if remaining <= 0 else None,
+            'stopped_at_limit': stopped,
+            'horizon_days': self.config.SIMULATION_MAX_DAYS,
+            'latency': self.latency,
+            'auto_send': settings.auto_send
+        }
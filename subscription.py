@@ -0,0 +1,123 @@
+import asyncio
+import base64
+import gzip
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from protocols import PROTOCOL_NAMES
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class SubscriptionPayload:
+    body: bytes
+    gzipped: bytes
+    etag: str
+    count: int
+
+class SubscriptionServer:
+    MAX_CACHED = 64
+    
+    def __init__(self, db, config):
+        self.db = db
+        self.config = config
+        self.cache: OrderedDict = OrderedDict()
+        self.locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.generation = 0
+        self.runner = None
+        self.protocols = {name.lower(): name for name in PROTOCOL_NAMES.values()}
+        self.protocols.update(PROTOCOL_NAMES)
+    
+    def invalidate(self):
+        self.generation += 1
+        self.cache.clear()
+    
+    async def start(self):
+        if not self.config.SUBSCRIPTION_PORT:
+            return
+        
+        # aiohttp is only loaded when the feed is enabled
+        from aiohttp import web
+        
+        app = web.Application()
+        app.router.add_get(f"/{self.config.SUBSCRIPTION_PATH.strip('/')}", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.config.SUBSCRIPTION_HOST, self.config.SUBSCRIPTION_PORT)
+        await site.start()
+        self.db.add_change_listener(self.invalidate)
+        logger.info(f"Subscription feed listening on {self.config.SUBSCRIPTION_HOST}:{self.config.SUBSCRIPTION_PORT}")
+    
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+    
+    def cache_key(self, request) -> Optional[Tuple[str, str]]:
+        protocol = request.query.get('protocol', '').strip().lower()
+        if protocol and protocol not in self.protocols:
+            return None
+        location = request.query.get('location', '').strip()[:32]
+        return self.protocols.get(protocol, ''), location.lower()
+    
+    async def payload(self, key: Tuple[str, str]) -> SubscriptionPayload:
+        cached = self.cache.get(key)
+        if cached:
+            self.cache.move_to_end(key)
+            return cached
+        
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self.cache.get(key)
+            if cached:
+                return cached
+            
+            generation = self.generation
+            protocol, location = key
+            links = await self.db.get_live_links(
+                protocol, location, self.config.SUBSCRIPTION_MAX_REPORTS, self.config.SUBSCRIPTION_LIMIT
+            )
+            body = base64.b64encode('\n'.join(links).encode('utf-8'))
+            payload = SubscriptionPayload(
+                body=body,
+                gzipped=gzip.compress(body, compresslevel=6),
+                etag=f'"{hashlib.sha1(body).hexdigest()[:20]}"',
+                count=len(links)
+            )
+            
+            # A change during the query may not be in these links, so serve them once without caching
+            if generation == self.generation:
+                self.cache[key] = payload
+                while len(self.cache) > self.MAX_CACHED:
+                    self.cache.popitem(last=False)
+            self.locks.pop(key, None)
+            return payload
+    
+    async def handle(self, request):
+        from aiohttp import web
+        
+        key = self.cache_key(request)
+        if key is None:
+            return web.Response(status=400, text='unknown protocol')
+        
+        payload = await self.payload(key)
+        headers = {
+            'ETag': payload.etag,
+            'Cache-Control': f"public, max-age={self.config.SUBSCRIPTION_MAX_AGE}",
+            'Vary': 'Accept-Encoding',
+            'Profile-Update-Interval': str(self.config.SUBSCRIPTION_UPDATE_HOURS),
+            'Profile-Title': f"base64:{base64.b64encode(self.config.BRAND_NAME.encode('utf-8')).decode('ascii')}"
+        }
+        
+        if payload.etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers=headers)
+        
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            headers['Content-Encoding'] = 'gzip'
+            body = payload.gzipped
+        else:
+            body = payload.body
+        return web.Response(body=body, headers=headers, content_type='text/plain', charset='utf-8')
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from models import ConfigRecord
+from processor import quality_for_ping
+
+logger = logging.getLogger(__name__)
+
+class Sweeper:
+    def __init__(self, db, config, refresher=None):
+        self.db = db
+        self.config = config
+        self.refresher = refresher
+        self.running = False
+    
+    async def run(self, bot):
+        while True:
+            try:
+                if await self.db.get_setting('sweeper_enabled', 'true') == 'true':
+                    await self.sweep(bot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Sweep failed: %s", e)
+            
+            await asyncio.sleep(self.config.SWEEP_INTERVAL)
+    
+    async def sweep(self, bot) -> int:
+        if self.running:
+            return 0
+        
+        self.running = True
+        retired = 0
+        try:
+            raw_cursor = await self.db.get_setting('sweep_cursor', '')
+            cursor = json.loads(raw_cursor) if raw_cursor else None
+            if cursor and len(cursor) != 3:
+                cursor = None
+            if cursor:
+                logger.info("Resuming sweep from %s", cursor)
+            else:
+                await self.db.start_sweep()
+            
+            while True:
+                batch, next_cursor = await self.db.get_sweep_batch(cursor, self.config.SWEEP_BATCH_SIZE)
+                if not batch:
+                    break
+                
+                results = await self.probe_batch(batch)
+                dead = await self.db.record_probe_results(
+                    {uuid: latency is not None for uuid, latency in results.items()},
+                    self.config.SWEEP_FAIL_THRESHOLD
+                )
+                dead_set = set(dead)
+                await self.apply_probe_changes([cfg for cfg in batch if cfg.uuid not in dead_set], results)
+                if dead:
+                    await self.retire(bot, [cfg for cfg in batch if cfg.uuid in dead_set])
+                    retired += len(dead)
+                
+                cursor = next_cursor
+                await self.db.set_setting('sweep_cursor', json.dumps(cursor))
+            
+            await self.db.set_setting('sweep_cursor', '')
+            logger.info("Sweep finished, %s dead configs retired", retired)
+        finally:
+            self.running = False
+        
+        if retired:
+            await self.notify_admin(bot, f"🧹 {retired} کانفیگ خراب در بررسی دوره‌ای حذف شد.")
+        return retired
+    
+    async def probe(self, server: str, port: int) -> Optional[float]:
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(server, port),
+                timeout=self.config.PROBE_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError):
+            return None
+        latency = (time.perf_counter() - started) * 1000
+        
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return latency
+    
+    def probe_changes(self, configs: List[ConfigRecord],
+                      results: Dict[str, Optional[float]]) -> Tuple[Dict[str, Tuple[str, str]], List[str]]:
+        pings = {}
+        changed = []
+        for cfg in configs:
+            if cfg.uuid not in results:
+                continue
+            latency = results[cfg.uuid]
+            # The status line flips between reachable and unreachable on the first failure and on recovery
+            flipped = (latency is None) != (cfg.probe_failures > 0)
+            if latency is not None:
+                ping = f"{latency:.0f}ms"
+                quality = quality_for_ping(ping)
+                # Only a new quality band rewrites the ping, otherwise every sweep would edit every post
+                if quality != cfg.quality:
+                    pings[cfg.uuid] = (ping, quality)
+            if flipped or cfg.uuid in pings:
+                changed.append(cfg.uuid)
+        return pings, changed
+    
+    async def apply_probe_changes(self, configs: List[ConfigRecord], results: Dict[str, Optional[float]]):
+        pings, changed = self.probe_changes(configs, results)
+        await self.db.update_pings(pings)
+        if self.refresher:
+            for uuid in changed:
+                self.refresher.mark(uuid)
+    
+    async def probe_batch(self, configs: List[ConfigRecord]) -> Dict[str, Optional[float]]:
+        semaphore = asyncio.Semaphore(self.config.PROBE_CONCURRENCY)
+        
+        async def check(cfg):
+            async with semaphore:
+                return cfg.uuid, await self.probe(cfg.server, cfg.port)
+        
+        probeable = [cfg for cfg in configs if cfg.server and cfg.server != 'unknown' and cfg.port]
+        results = await asyncio.gather(*(check(cfg) for cfg in probeable))
+        return dict(results)
+    
+    async def retire(self, bot, configs: List[ConfigRecord]):
+        shared = await self.db.get_shared_messages([cfg.uuid for cfg in configs])
+        by_channel = defaultdict(set)
+        for cfg in configs:
+            if cfg.channel_id and cfg.message_id and (cfg.channel_id, cfg.message_id) not in shared:
+                by_channel[cfg.channel_id].add(cfg.message_id)
+        
+        for channel_id, message_ids in by_channel.items():
+            for message_id in sorted(message_ids):
+                try:
+                    await bot.delete_message(chat_id=channel_id, message_id=message_id)
+                except Exception as e:
+                    logger.error("Failed to delete message %s in %s: %s", message_id, channel_id, e)
+                await asyncio.sleep(self.config.DELETE_INTERVAL)
+        
+        await self.db.delete_configs([cfg.uuid for cfg in configs])
+        if self.refresher:
+            for channel_id, message_id in sorted(shared):
+                await self.refresher.refresh_digest(bot, channel_id, message_id)
+                await asyncio.sleep(self.config.DELETE_INTERVAL)
+        logger.info("Retired %s dead configs", len(configs))
+    
+    async def notify_admin(self, bot, text: str):
+        try:
+            await bot.send_message(chat_id=self.config.ADMIN_ID, text=text)
+        except Exception as e:
+            logger.error("Failed to notify admin: %s", e)
@@ -0,0 +1,112 @@
+import base64
+import json
+
+import pytest
+
+from protocols import ParsedLink, parse_link
+
+UUID = '9b1deb4d-3b7d-4bad-9bdd-2b0d7b3dcb6d'
+
+def _vmess(data: dict) -> str:
+    return 'vmess://' + base64.b64encode(json.dumps(data).encode()).decode()
+
+ROUND_TRIP_LINKS = [
+    _vmess({
+        'v': '2', 'ps': 'NONEcore 🇩🇪', 'add': 'de.example.com', 'port': '443', 'id': UUID,
+        'aid': '0', 'scy': 'auto', 'net': 'ws', 'type': 'none', 'host': 'cdn.example.com',
+        'path': '/ws', 'tls': 'tls', 'sni': 'cdn.example.com'
+    }),
+    _vmess({'v': '2', 'ps': '', 'add': '1.2.3.4', 'port': 8080, 'id': UUID, 'net': 'tcp', 'tls': ''}),
+    f'vless://{UUID}@vless.example.com:443?encryption=none&security=reality&sni=www.microsoft.com'
+    f'&fp=chrome&pbk=abc123&sid=6ba85179&type=grpc&serviceName=grpc#Reality%20%7C%20NL',
+    f'vless://{UUID}@[2001:db8::1]:8443?type=ws&path=%2Fws&security=tls#ipv6',
+    'trojan://p%40ss%3Aword@trojan.example.com:443?sni=trojan.example.com&type=tcp#Trojan%20FR',
+    'trojan://secret@10.0.0.1:443',
+    'ss://' + base64.urlsafe_b64encode(b'chacha20-ietf-poly1305:pa:ss').decode().rstrip('=')
+    + '@ss.example.com:8388#SS%20US',
+    'ss://' + base64.b64encode(b'aes-256-gcm:secret@5.6.7.8:443').decode() + '#legacy',
+    'ss://aes-128-gcm:secret@ss.example.com:8388/?plugin=obfs-local%3Bobfs%3Dhttp#plugin',
+]
+
+def _fields(parsed: ParsedLink) -> tuple:
+    return (
+        parsed.protocol, parsed.server, parsed.port, parsed.credential, parsed.transport,
+        parsed.security, parsed.sni, parsed.remark, parsed.method, parsed.params
+    )
+
+@pytest.mark.parametrize('link', ROUND_TRIP_LINKS)
+def test_round_trip(link):
+    parsed = parse_link(link)
+    assert parsed is not None
+    
+    reparsed = parse_link(parsed.to_uri())
+    assert reparsed is not None
+    assert _fields(reparsed) == _fields(parsed)
+    assert reparsed.fingerprint() == parsed.fingerprint()
+    assert reparsed.to_uri() == parsed.to_uri()
+
+def test_vmess_fields():
+    parsed = parse_link(ROUND_TRIP_LINKS[0])
+    assert parsed.type_name == 'VMess'
+    assert (parsed.server, parsed.port, parsed.credential) == ('de.example.com', 443, UUID)
+    assert (parsed.transport, parsed.security, parsed.sni) == ('ws', 'tls', 'cdn.example.com')
+    assert parsed.remark == 'NONEcore 🇩🇪'
+    assert parsed.params['path'] == '/ws'
+
+def test_vless_fields():
+    parsed = parse_link(ROUND_TRIP_LINKS[2])
+    assert parsed.type_name == 'VLESS'
+    assert (parsed.transport, parsed.security, parsed.sni) == ('grpc', 'reality', 'www.microsoft.com')
+    assert parsed.remark == 'Reality | NL'
+
+def test_ipv6_host():
+    parsed = parse_link(ROUND_TRIP_LINKS[3])
+    assert (parsed.server, parsed.port) == ('2001:db8::1', 8443)
+    assert '@[2001:db8::1]:8443' in parsed.to_uri()
+
+def test_trojan_defaults_to_tls():
+    parsed = parse_link(ROUND_TRIP_LINKS[5])
+    assert parsed.security == 'tls'
+    assert parsed.transport == 'tcp'
+
+def test_trojan_credential_is_unquoted():
+    assert parse_link(ROUND_TRIP_LINKS[4]).credential == 'p@ss:word'
+
+@pytest.mark.parametrize('link, method, password, server', [
+    (ROUND_TRIP_LINKS[6], 'chacha20-ietf-poly1305', 'pa:ss', 'ss.example.com'),
+    (ROUND_TRIP_LINKS[7], 'aes-256-gcm', 'secret', '5.6.7.8'),
+    (ROUND_TRIP_LINKS[8], 'aes-128-gcm', 'secret', 'ss.example.com'),
+])
+def test_shadowsocks_forms(link, method, password, server):
+    parsed = parse_link(link)
+    assert (parsed.method, parsed.credential, parsed.server) == (method, password, server)
+
+def test_scheme_is_case_insensitive():
+    assert parse_link('TROJAN://secret@example.com:443').protocol == 'trojan'
+
+def test_fingerprint_ignores_remark_and_host_case():
+    first = parse_link('trojan://secret@Example.COM:443#one')
+    second = parse_link('trojan://secret@example.com:443?sni=x#two')
+    assert first.fingerprint() == second.fingerprint()
+
+@pytest.mark.parametrize('link', [
+    '',
+    'not a link',
+    'http://example.com',
+    'vless://',
+    f'vless://{UUID}@example.com',
+    f'vless://{UUID}@example.com:0',
+    f'vless://{UUID}@example.com:70000',
+    f'vless://{UUID}@example.com:port',
+    'vless://@example.com:443',
+    'trojan://example.com:443',
+    'vmess://%%%not-base64%%%',
+    'vmess://' + base64.b64encode(b'{"add": "example.com"').decode(),
+    _vmess({'add': 'example.com', 'id': UUID}),
+    _vmess({'add': 'example.com', 'port': '99999', 'id': UUID}),
+    'ss://' + base64.b64encode(b'aes-256-gcm@example.com:443').decode(),
+    'ss://' + base64.b64encode(b'\xff\xfe\xfd').decode() + '@example.com:443',
+    'ss://aes-256-gcm:secret@example.com',
+])
+def test_malformed_links(link):
+    assert parse_link(link) is None